@@ -8,6 +8,12 @@ from .swagger import swagger_ui_blueprint, register_swagger_routes, SWAGGER_URL
 import logging
 from pathlib import Path
 from .utils.file_management import archive_processed_receipts, cleanup_temp_reports
+from .utils.ocr_jobs import ocr_jobs
+from .utils.ocr_cache import ocr_cache
+from .utils.ocr_pool import ocr_pool
+from .utils.ocr_admission import ocr_admission
+from .utils.rate_limiter import rate_limiter
+from .utils.report_pipeline import report_pipeline
 
 # Apply patches to fix dependency warnings
 apply_all_patches()
@@ -37,6 +43,24 @@ def create_app(config_class=Config):
     # Initialize Flask-Mail
     mail.init_app(app)
     
+    # Configure the background OCR job executor
+    ocr_jobs.init_app(app)
+    
+    # Configure the OCR result cache
+    ocr_cache.init_app(app)
+    
+    # Start and warm up the OCR worker pool
+    ocr_pool.init_app(app)
+    
+    # Cap concurrent OCR runs across all requests
+    ocr_admission.init_app(app)
+    
+    # Share OCR rate limits between worker processes
+    rate_limiter.init_app(app)
+    
+    # Build submitted expense reports in the background
+    report_pipeline.init_app(app)
+    
     # Register blueprints
     from .auth import auth as auth_blueprint
     app.register_blueprint(auth_blueprint, url_prefix='/auth')
@@ -56,7 +80,10 @@ def create_app(config_class=Config):
         with app.app_context():
             archived = archive_processed_receipts()
             cleaned = cleanup_temp_reports()
-            print(f"Archived {archived} receipts and cleaned up {cleaned} temporary files.")
+            pruned = ocr_cache.prune_disk()
+            requeued = report_pipeline.recover()
+            print(f"Archived {archived} receipts, cleaned up {cleaned} temporary files, pruned {pruned} OCR cache entries "
+                  f"and requeued {requeued} stalled reports.")
 
     # Register Swagger UI blueprint
     app.register_blueprint(swagger_ui_blueprint, url_prefix=SWAGGER_URL)
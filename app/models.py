@@ -36,9 +36,15 @@ class Receipt(db.Model):
     archived = db.Column(db.Boolean, default=False, nullable=False)
     comment = db.Column(db.String(500))
     reviewer_notes = db.Column(db.Text, nullable=True)
+    progress = db.Column(db.Integer, nullable=True)  # Report build progress while status is 'processing'
+    report_data = db.Column(db.Text, nullable=True)  # JSON input of the report pipeline, kept until the PDF is built
+    report_updated_at = db.Column(db.DateTime(timezone=True), nullable=True)  # Last sign of life of the report build
+    report_claim = db.Column(db.String(32), nullable=True)  # Token of the build allowed to write the report
 
     @property
     def file_path(self):
+        if not self.file_path_db:
+            return None
         return os.path.basename(self.file_path_db)
 
     @classmethod
@@ -1,6 +1,11 @@
 import logging
 import os
-from .utils.ocr_processor import process_image, process_pdf
+from .utils.ocr_processor import process_image, process_pdf, get_ocr_settings
+from .utils.ocr_cache import ocr_cache
+from .utils.ocr_metrics import ScanMetrics, ocr_metrics
+from .utils.ocr_admission import ocr_admission, OCRBusy
+from .utils.ocr_profiles import get_profile, PREVIEW_PROFILE
+from .utils.ocr_jobs import ocr_jobs, OCRJobQueueFull
 
 class ReceiptScanner:
     """
@@ -8,7 +13,9 @@ class ReceiptScanner:
     Supports multiple languages and currencies.
     """
 
-    def __init__(self):
+    def __init__(self, background=False):
+        # Background scans (jobs, batches) wait for an OCR slot instead of being turned away
+        self.background = background
         self.logger = logging.getLogger(__name__)
         # Set logging level to DEBUG
         self.logger.setLevel(logging.DEBUG)
@@ -20,52 +27,138 @@ class ReceiptScanner:
             console_handler.setFormatter(formatter)
             self.logger.addHandler(console_handler)
 
-    def scan_receipt(self, file):
+    def scan_receipt(self, file, filename=None, profile=None):
         """
         Scan a receipt file to extract information.
+        
+        The upload is read into memory once and passed through the OCR
+        pipeline as bytes; nothing is written to disk.
+        
         Args:
-            file: File object from request or file path string
+            file: File object from request, file path string or raw bytes
+            filename (str): Original filename, required when file is bytes
+            profile (str): OCR profile name (fast, balanced, accurate), the default profile if not given
         Returns:
-            dict: Extracted receipt information
+            dict: Extracted receipt information, with the profile used under 'ocr_profile'
+        Raises:
+            OCRBusy: If the OCR admission queue is full or the wait for a slot timed out
+            ValueError: If the profile does not exist
         """
+        profile, _ = get_profile(profile)
         try:
-            # Check if file is a string (path) or a file object
-            if isinstance(file, str):
-                # It's already a file path
-                temp_path = file
-                filename = os.path.basename(file)
-                self.logger.info(f"Scanning receipt from path: {filename}")
-            else:
-                # It's a file object from request
-                filename = file.filename
-                temp_path = f"/tmp/{filename}"
-                self.logger.info(f"Scanning receipt: {filename}")
-                file.save(temp_path)
+            data, filename = self.read_upload(file, filename)
+            ocr_metrics.increment('scans')
+            
+            # Identical uploads with identical settings skip OCR entirely
+            cache_key = ocr_cache.make_key(data, get_ocr_settings(profile))
+            cached = ocr_cache.get(cache_key)
+            if cached is not None:
+                self.logger.info(f"OCR cache hit for {filename}")
+                ocr_metrics.increment('cache_hits')
+                cached['cache_hit'] = True
+                return cached
             
-            # Process based on file type
+            # Process based on file type, holding one of the global OCR slots
+            metrics = ScanMetrics()
             if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')):
-                result = process_image(temp_path)
+                with ocr_admission.slot(background=self.background):
+                    # The time budget covers OCR, not the wait for a slot
+                    metrics.restart('admission_wait')
+                    result = process_image(data, metrics=metrics, profile=profile)
             elif filename.lower().endswith('.pdf'):
-                result = process_pdf(temp_path)
+                with ocr_admission.slot(background=self.background):
+                    metrics.restart('admission_wait')
+                    result = process_pdf(data, metrics=metrics, profile=profile)
             else:
                 result = {"error": "Unsupported file type", "total": None, "date": None, "currency": None}
             
-            # Clean up only if we created the temp file
-            if not isinstance(file, str):
-                try:
-                    os.remove(temp_path)
-                except Exception as e:
-                    self.logger.warning(f"Failed to remove temporary file: {str(e)}")
-                
+            result['ocr_profile'] = profile
+            metrics.publish(ocr_metrics)
+            ocr_metrics.increment(f"profile.{profile}")
+            if result.get('error'):
+                ocr_metrics.increment('errors')
+            
+            if result.get('truncated'):
+                # A scan cut short by its time budget may do better next time
+                ocr_metrics.increment('truncated')
+            else:
+                ocr_cache.set(cache_key, result)
             return result
             
+        except OCRBusy:
+            ocr_metrics.increment('busy')
+            raise
         except Exception as e:
             self.logger.error(f"Error in scan_receipt: {str(e)}", exc_info=True)
             return {"error": f"Receipt scanning failed: {str(e)}", "total": None, "date": None, "currency": None}
     
+    def scan_progressive(self, file, filename=None, profile=None, owner=None):
+        """
+        Two-phase scan for prefill: a quick guess now, the full scan later.
+        
+        The preview profile reads a small grayscale copy in the request; the
+        full-resolution scan is queued as a background job whose result the
+        client polls for.
+        
+        Args:
+            file: File object from request, file path string or raw bytes
+            filename (str): Original filename, required when file is bytes
+            profile (str): OCR profile of the refined scan, the default profile if not given
+            owner (str): Identifier allowed to read the refine job
+        Returns:
+            dict: Preview result with phase 'preview' and the refine job id under
+                  'refine_job_id' (None if the job queue was full)
+        Raises:
+            OCRBusy: If the preview scan was not admitted
+            ValueError: If the profile does not exist
+        """
+        profile, _ = get_profile(profile)
+        data, filename = self.read_upload(file, filename)
+        preview = self.scan_receipt(data, filename, profile=PREVIEW_PROFILE)
+        preview['phase'] = 'preview'
+        
+        try:
+            preview['refine_job_id'] = ocr_jobs.submit(refine_scan, data, filename, profile, owner=owner)
+        except OCRJobQueueFull:
+            # The preview still fills the form; the user just gets no refinement
+            self.logger.warning(f"OCR queue full, no refined scan for {filename}")
+            preview['refine_job_id'] = None
+        return preview
+    
+    def read_upload(self, file, filename=None):
+        """
+        Read an upload into memory.
+        Returns:
+            tuple: (data, filename)
+        """
+        # Check if file is a string (path), raw bytes or a file object
+        if isinstance(file, str):
+            # It's a file path
+            filename = os.path.basename(file)
+            self.logger.info(f"Scanning receipt from path: {filename}")
+            with open(file, 'rb') as f:
+                data = f.read()
+        elif isinstance(file, (bytes, bytearray)):
+            data = bytes(file)
+            self.logger.info(f"Scanning receipt from memory: {filename}")
+        else:
+            # It's a file object from request
+            filename = file.filename
+            self.logger.info(f"Scanning receipt: {filename}")
+            data = file.read()
+            file.seek(0)
+        return data, filename or ''
+    
     # Add this method to maintain backward compatibility
-    def process_receipt(self, file):
+    def process_receipt(self, file, filename=None, profile=None):
         """
         Alias for scan_receipt to maintain backward compatibility.
         """
-        return self.scan_receipt(file)
\ No newline at end of file
+        return self.scan_receipt(file, filename, profile)
+
+
+def refine_scan(data, filename, profile=None):
+    """Background job: the full scan of a progressive scan."""
+    result = ReceiptScanner(background=True).scan_receipt(data, filename, profile=profile)
+    result['phase'] = 'final'
+    return result
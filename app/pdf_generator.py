@@ -5,7 +5,12 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+import copy
+import functools
+import gc
 import os
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
 from PyPDF2 import PdfMerger
 from datetime import datetime
 import uuid
@@ -13,67 +18,44 @@ from PIL import Image
 import io
 from reportlab.graphics.shapes import Drawing, String
 from reportlab.lib.enums import TA_RIGHT
+from reportlab.lib.utils import ImageReader
+from reportlab import rl_config
+from .utils.ocr_utils import setup_logger
 
-class ExpenseReportGenerator:
-    def __init__(self, user_name, expense_type='other'):
-        self.user_name = user_name
-        self.expense_type = expense_type
-        self.styles = getSampleStyleSheet()
-        
-    def generate_report(self, expenses, travel_details=None, comment=None):
-        print("\n=== PDF GENERATION DEBUG ===")
-        print("1. Initial Setup")
-        
-        # Create absolute path for temp directory
-        base_dir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
-        temp_dir = os.path.join(base_dir, 'temp')
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Get first name only
-        first_name = self.user_name.split()[0].lower()  # Split name and take first part
-        
-        # Generate unique filename and receipt number
-        report_id = f"{first_name}-{datetime.now().strftime('%Y-%m-%d')}-{uuid.uuid4().hex[:6]}"
-        receipt_number = f"{first_name}-{datetime.now().strftime('%Y-%m')}-n{uuid.uuid4().hex[:3]}a"
-        final_pdf = os.path.join(temp_dir, f"{report_id}_summary.pdf")
-        
-        # Adjust document margins
-        doc = SimpleDocTemplate(
-            final_pdf,
-            pagesize=A4,
-            leftMargin=30,  # Reduced from default (usually around 72)
-            rightMargin=30,  # Reduced from default
-            topMargin=30,   # Reduced from default
-        )
-        
-        story = []
-        
-        # Create header table
-        from reportlab.graphics.shapes import Drawing, String
-        
-        # Create the drawing for B&B with more elegant styling
-        logo_width = 300
-        logo_height = 40
-        d = Drawing(logo_width, logo_height)
-        logo = String(0, 5, 'B&B', fontName='Times-Bold', fontSize=56)
-        d.add(logo)
-        
-        # Format receipt number and date
-        current_date = datetime.now().strftime('%d.%m.%Y')
-        
-        # More elegant styles for text elements
-        receipt_style = ParagraphStyle(
-            'Receipt',
-            fontName='Helvetica',  # Changed from Helvetica-Light to standard Helvetica
+# Set up logger
+logger = setup_logger(__name__)
+
+# Receipt photos are resampled to this resolution for the A4 page they fill and
+# re-encoded as JPEG; phone photos are several times larger than that
+REPORT_IMAGE_DPI = int(os.environ.get('REPORT_IMAGE_DPI', 150))
+REPORT_IMAGE_QUALITY = int(os.environ.get('REPORT_IMAGE_QUALITY', 80))
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.tif', '.tiff')
+RENDER_PREFETCH = 8  # Prepared photos (about 1 MB each) held ahead of the canvas
+
+# Embedded images are binary JPEG streams either way; reportlab's pure-Python
+# ASCII85 encoding of them took longer than preparing the photo and made the PDF larger
+rl_config.useA85 = 0
+
+class ReportTemplate:
+    """
+    Static parts of the summary page: paragraph styles, the expense table
+    style and the B&B logo. Built once per process by report_template() and
+    shared by every ExpenseReportGenerator; styles are only read while a
+    document is built. Flowables remember the canvas they are drawn on, so
+    each report gets its own copy of the logo.
+    """
+
+    def __init__(self):
+        # Right-aligned header lines (receipt number and date)
+        self.header_style = ParagraphStyle(
+            'RightStyle',
+            parent=getSampleStyleSheet()['Normal'],
+            alignment=TA_RIGHT,
             fontSize=10,
-            alignment=2,
-            rightIndent=0,
-            spaceBefore=0,
-            spaceAfter=0,
             leading=12
         )
         
-        title_style = ParagraphStyle(
+        self.title_style = ParagraphStyle(
             'Title',
             fontName='Helvetica',
             fontSize=18,
@@ -82,7 +64,7 @@ class ExpenseReportGenerator:
             spaceAfter=16
         )
         
-        heading_style = ParagraphStyle(
+        self.heading_style = ParagraphStyle(
             'Heading2',
             fontName='Helvetica-Bold',
             fontSize=12,
@@ -91,7 +73,7 @@ class ExpenseReportGenerator:
             spaceAfter=4
         )
         
-        normal_style = ParagraphStyle(
+        self.normal_style = ParagraphStyle(
             'Normal',
             fontName='Helvetica',  # Changed from Helvetica-Light to standard Helvetica
             fontSize=11,
@@ -99,7 +81,7 @@ class ExpenseReportGenerator:
         )
         
         # Create styles with darker, bolder labels
-        label_style = ParagraphStyle(
+        self.label_style = ParagraphStyle(
             'Label',
             fontName='Helvetica-Bold',  # Bold font
             fontSize=11,
@@ -108,7 +90,7 @@ class ExpenseReportGenerator:
         )
         
         # Table styles with standard fonts
-        table_style = TableStyle([
+        self.table_style = TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E8E8E8')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#333333')),
             ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
@@ -123,41 +105,66 @@ class ExpenseReportGenerator:
             ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#CCCCCC'))
         ])
         
-        # Add negative space at the top of the page
-        story.append(Spacer(1, -20))  # This will pull everything up
+        # The drawing for B&B with more elegant styling
+        logo_width = 300
+        logo_height = 40
+        self.logo = Drawing(logo_width, logo_height)
+        self.logo.add(String(0, 5, 'B&B', fontName='Times-Bold', fontSize=56))
+
+    def header(self, receipt_number, current_date):
+        """Flowables for the top of the summary page, up to the "Expense claim" title."""
+        return [
+            Spacer(1, -20),  # Add negative space at the top of the page
+            Paragraph(f"Rechnungsnummer: {receipt_number}", self.header_style),
+            Paragraph(f"Datum: {current_date}", self.header_style),
+            copy.copy(self.logo),
+            Spacer(1, -8),  # Reduced from -4 to -8 to bring "Expense claim" closer to B&B
+            Paragraph("Expense claim", self.title_style),
+        ]
+
+@functools.lru_cache(maxsize=None)
+def report_template():
+    """The process-wide ReportTemplate."""
+    return ReportTemplate()
+
+class ExpenseReportGenerator:
+    def __init__(self, user_name, expense_type='other'):
+        self.user_name = user_name
+        self.expense_type = expense_type
+        self.template = report_template()
+        
+    def generate_report(self, expenses, travel_details=None, comment=None):
+        # Create absolute path for temp directory
+        base_dir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+        temp_dir = os.path.join(base_dir, 'temp')
+        os.makedirs(temp_dir, exist_ok=True)
         
-        # Create two separate paragraphs for header info
-        rechnungsnummer = Paragraph(
-            f"Rechnungsnummer: {receipt_number}",
-            ParagraphStyle(
-                'RightStyle',
-                parent=self.styles['Normal'],
-                alignment=TA_RIGHT,
-                fontSize=10,
-                leading=12
-            )
-        )
+        # Get first name only
+        first_name = self.user_name.split()[0].lower()  # Split name and take first part
         
-        datum = Paragraph(
-            f"Datum: {current_date}",
-            ParagraphStyle(
-                'RightStyle',
-                parent=self.styles['Normal'],
-                alignment=TA_RIGHT,
-                fontSize=10,
-                leading=12
-            )
+        # Generate unique filename and receipt number
+        report_id = f"{first_name}-{datetime.now().strftime('%Y-%m-%d')}-{uuid.uuid4().hex[:6]}"
+        receipt_number = f"{first_name}-{datetime.now().strftime('%Y-%m')}-n{uuid.uuid4().hex[:3]}a"
+        final_pdf = os.path.join(temp_dir, f"{report_id}_summary.pdf")
+        logger.debug(f"Generating summary {report_id} for {len(expenses)} expenses")
+        
+        # Adjust document margins
+        doc = SimpleDocTemplate(
+            final_pdf,
+            pagesize=A4,
+            leftMargin=30,  # Reduced from default (usually around 72)
+            rightMargin=30,  # Reduced from default
+            topMargin=30,   # Reduced from default
         )
-
-        # Add them to the story
-        story.append(rechnungsnummer)
-        story.append(datum)
         
-        story.append(d)
-        story.append(Spacer(1, -8))  # Reduced from -4 to -8 to bring "Expense claim" closer to B&B
+        template = self.template
+        heading_style = template.heading_style
+        normal_style = template.normal_style
+        label_style = template.label_style
         
-        # Add "Expense claim" subtitle
-        story.append(Paragraph("Expense claim", title_style))
+        # Header: receipt number, date, logo and title
+        current_date = datetime.now().strftime('%d.%m.%Y')
+        story = template.header(receipt_number, current_date)
         
         # Add employee info
         story.append(Paragraph("Employee", heading_style))
@@ -217,7 +224,7 @@ class ExpenseReportGenerator:
         
         # Create the table
         expense_table = Table(table_data, colWidths=[80, 200, 100, 100])
-        expense_table.setStyle(table_style)
+        expense_table.setStyle(template.table_style)
         
         # Build the story
         story.append(expense_table)
@@ -228,87 +235,227 @@ class ExpenseReportGenerator:
         return final_pdf, report_id
     
     @staticmethod
-    def merge_with_receipts(summary_pdf, receipt_paths):
+    def compress_image(img, width, height, dpi=REPORT_IMAGE_DPI, quality=REPORT_IMAGE_QUALITY):
+        """
+        Resample an image to the resolution it is drawn at and encode it as JPEG.
+        Args:
+            img (PIL.Image.Image): Image in mode RGB or L
+            width, height (float): Drawn size in points
+        Returns:
+            bytes: JPEG data, never upscaled
+        """
+        target = (max(1, round(width / 72 * dpi)), max(1, round(height / 72 * dpi)))
+        if img.width > target[0] or img.height > target[1]:
+            img = img.resize(target, Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=quality, optimize=True)
+        return buffer.getvalue()
+
+    @staticmethod
+    def merge_with_receipts(summary_pdf, receipt_paths, stats=None, executor=None, on_page=None):
+        """
+        Append the receipts to the summary PDF.
+
+        All image receipts are drawn in one canvas pass into a scratch PDF on
+        disk; the summary, those pages and the uploaded PDFs are then appended
+        in upload order by path and written straight to the output file,
+        without a one-page intermediate PDF per image.
+        Args:
+            summary_pdf (str): Path of the generated summary
+            receipt_paths (list): Uploaded images and PDFs, one page per image
+            stats (dict): Filled with image_bytes_original, image_bytes_embedded and bytes_saved
+            executor (concurrent.futures.Executor): Process pool preparing the photos
+            on_page (callable): Called without arguments after each image page is drawn
+        Returns:
+            str: Path of the complete PDF, the summary if merging failed
+        """
+        if stats is not None:
+            stats.update(image_bytes_original=0, image_bytes_embedded=0, bytes_saved=0)
+        final_path = summary_pdf.replace('_summary.pdf', '_complete.pdf')
+        images_path = summary_pdf.replace('_summary.pdf', '_images.pdf')
         try:
-            from reportlab.pdfgen import canvas
-            from reportlab.lib.pagesizes import A4
-            from PyPDF2 import PdfReader, PdfWriter
-            import io
+            image_pages = ExpenseReportGenerator.draw_image_pages(images_path, receipt_paths, stats, executor, on_page)
             
-            # Create a new PDF writer for the final document
-            final_writer = PdfWriter()
+            # Upload order, with consecutive image pages appended as one range.
+            # Files are appended by path so PdfMerger reads pages from disk
+            segments = []
+            for index, receipt_path in enumerate(receipt_paths):
+                if index in image_pages:
+                    page = image_pages[index]
+                    if segments and segments[-1][0] == images_path and segments[-1][1][1] == page:
+                        segments[-1] = (images_path, (segments[-1][1][0], page + 1))
+                    else:
+                        segments.append((images_path, (page, page + 1)))
+                elif not receipt_path.lower().endswith(IMAGE_EXTENSIONS):
+                    segments.append((receipt_path, None))
             
-            # Add the summary PDF first
-            summary_reader = PdfReader(summary_pdf)
-            for page in summary_reader.pages:
-                final_writer.add_page(page)
-            
-            # Process and add each receipt
-            for receipt_path in receipt_paths:
-                if receipt_path.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.tif', '.tiff')):
+            merger = PdfMerger()
+            try:
+                merger.append(summary_pdf)
+                for path, pages in segments:
                     try:
-                        # Open image
-                        img = Image.open(receipt_path)
-                        
-                        # Convert to RGB if needed
-                        if img.mode not in ('RGB', 'L'):
-                            img = img.convert('RGB')
-                        
-                        # Create a PDF with reportlab
-                        packet = io.BytesIO()
-                        c = canvas.Canvas(packet, pagesize=A4)
-                        width, height = A4
-                        
-                        # Calculate dimensions to COMPLETELY fill the page (100%)
-                        img_ratio = img.width / img.height
-                        page_ratio = width / height
-                        
-                        if img_ratio > page_ratio:
-                            # Image is wider than page ratio - fit to width
-                            new_width = width  # Use 100% of page width
-                            new_height = new_width / img_ratio
-                        else:
-                            # Image is taller than page ratio - fit to height
-                            new_height = height  # Use 100% of page height
-                            new_width = new_height * img_ratio
-                        
-                        # Calculate position to center the image
-                        x = (width - new_width) / 2
-                        y = (height - new_height) / 2
-                        
-                        # Draw the image on the canvas
-                        c.drawImage(receipt_path, x, y, width=new_width, height=new_height)
-                        c.save()
-                        
-                        # Create a new PDF with the image
-                        packet.seek(0)
-                        new_pdf = PdfReader(packet)
-                        final_writer.add_page(new_pdf.pages[0])
-                        
+                        merger.append(path, pages=pages)
                     except Exception as e:
-                        print(f"Error processing image {receipt_path}: {str(e)}")
-                else:
-                    # For existing PDFs
-                    try:
-                        reader = PdfReader(receipt_path)
-                        for page in reader.pages:
-                            final_writer.add_page(page)
-                    except Exception as e:
-                        print(f"Error processing PDF {receipt_path}: {str(e)}")
-            
-            # Generate final PDF path
-            final_path = summary_pdf.replace('_summary.pdf', '_complete.pdf')
-            
-            # Write the complete PDF
-            with open(final_path, 'wb') as f:
-                final_writer.write(f)
+                        # Skip unreadable uploads, the rest of the report is still useful
+                        logger.error(f"Error processing PDF {path}: {str(e)}")
+                
+                # Write the complete PDF
+                merger.write(final_path)
+            finally:
+                merger.close()
             
             # Clean up summary PDF
             os.remove(summary_pdf)
             
             return final_path
         except Exception as e:
-            import traceback
-            print(f"Error merging PDFs: {str(e)}")
-            print(traceback.format_exc())
-            return summary_pdf 
\ No newline at end of file
+            logger.error(f"Error merging PDFs: {str(e)}", exc_info=True)
+            return summary_pdf
+        finally:
+            if os.path.exists(images_path):
+                os.remove(images_path)
+
+    @staticmethod
+    def draw_image_pages(path, receipt_paths, stats=None, executor=None, on_page=None):
+        """
+        Draw every image receipt on its own A4 page of a single PDF.
+
+        Decoding and resampling the photos (prepare_receipt_image) runs on
+        the executor when one is given and there is more than one photo;
+        the prepared JPEGs are placed on the canvas in upload order.
+        Args:
+            path (str): Output PDF, only written when there are images
+            receipt_paths (list): Uploaded receipts; PDFs are ignored
+            stats (dict): Byte counters, see merge_with_receipts
+            executor (concurrent.futures.Executor): Pool for prepare_receipt_image
+            on_page (callable): Called without arguments after each image
+        Returns:
+            dict: Index into receipt_paths -> page number in the output
+        """
+        indexes = [index for index, receipt_path in enumerate(receipt_paths)
+                   if receipt_path.lower().endswith(IMAGE_EXTENSIONS)]
+        if len(indexes) < 2:
+            executor = None
+        
+        pages = {}
+        c = canvas.Canvas(path, pagesize=A4)
+        prepared_images = _prepare_in_order([receipt_paths[index] for index in indexes], executor, stats)
+        for index, (receipt_path, prepared, error) in zip(indexes, prepared_images):
+            try:
+                if error is not None:
+                    raise error
+                if prepared['data'] is not None:
+                    image = ImageReader(io.BytesIO(prepared['data']))
+                else:
+                    image = receipt_path
+                
+                # Draw the image on its own page
+                c.drawImage(image, prepared['x'], prepared['y'], width=prepared['width'], height=prepared['height'])
+                c.showPage()
+                pages[index] = len(pages)
+                
+                if stats is not None:
+                    stats['image_bytes_original'] += prepared['original_size']
+                    stats['image_bytes_embedded'] += prepared['embedded_size']
+                    stats['bytes_saved'] += prepared['original_size'] - prepared['embedded_size']
+                
+                # The canvas keeps only the JPEG stream; ImageReader references itself
+                # and would hold the decoded pixels until the next full collection
+                del image, prepared
+                gc.collect(1)
+            except Exception as e:
+                logger.error(f"Error processing image {receipt_path}: {str(e)}")
+            if on_page is not None:
+                on_page()
+        
+        if pages:
+            c.save()
+        return pages
+
+def prepare_receipt_image(receipt_path, dpi=REPORT_IMAGE_DPI, quality=REPORT_IMAGE_QUALITY):
+    """
+    Decode a receipt photo, normalize its mode and resample it for its A4 page.
+    Runs in report render worker processes.
+    Returns:
+        dict: x, y, width, height of the image on the page in points, data (JPEG
+              bytes, None to embed the upload as is), original_size and embedded_size
+    """
+    width, height = A4
+    with Image.open(receipt_path) as img:
+        # Convert to RGB if needed
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        
+        # Calculate dimensions to COMPLETELY fill the page (100%)
+        img_ratio = img.width / img.height
+        page_ratio = width / height
+        
+        if img_ratio > page_ratio:
+            # Image is wider than page ratio - fit to width
+            new_width = width  # Use 100% of page width
+            new_height = new_width / img_ratio
+        else:
+            # Image is taller than page ratio - fit to height
+            new_height = height  # Use 100% of page height
+            new_width = new_height * img_ratio
+        
+        # Embed a copy resampled for the page instead of the full-size photo,
+        # unless the upload is already smaller
+        original_size = os.path.getsize(receipt_path)
+        data = ExpenseReportGenerator.compress_image(img, new_width, new_height, dpi=dpi, quality=quality)
+    
+    if len(data) >= original_size:
+        data = None
+    return {
+        'x': (width - new_width) / 2,  # Center the image
+        'y': (height - new_height) / 2,
+        'width': new_width,
+        'height': new_height,
+        'data': data,
+        'original_size': original_size,
+        'embedded_size': len(data) if data is not None else original_size,
+    }
+
+def _prepare_in_order(paths, executor=None, stats=None):
+    """
+    Prepare receipt photos in order, yielding (path, prepared, error) for each.
+    With an executor up to RENDER_PREFETCH photos are prepared ahead of the
+    caller; if its worker processes die, the rest are prepared in process and
+    stats['render_pool_broken'] is set.
+    """
+    remaining = deque(paths)
+    ahead = deque()  # (path, future), oldest first
+    while remaining or ahead:
+        if executor is not None:
+            try:
+                while remaining and len(ahead) < RENDER_PREFETCH:
+                    ahead.append((remaining[0], executor.submit(prepare_receipt_image, remaining[0])))
+                    remaining.popleft()
+            except BrokenProcessPool as e:
+                executor = _render_pool_broken(e, ahead, remaining, stats)
+        
+        if ahead:
+            receipt_path, future = ahead.popleft()
+            get = future.result
+        else:
+            receipt_path = remaining.popleft()
+            get = functools.partial(prepare_receipt_image, receipt_path)
+        
+        try:
+            prepared, error = get(), None
+        except BrokenProcessPool as e:
+            ahead.appendleft((receipt_path, future))
+            executor = _render_pool_broken(e, ahead, remaining, stats)
+            continue
+        except Exception as e:
+            prepared, error = None, e
+        yield receipt_path, prepared, error
+
+def _render_pool_broken(error, ahead, remaining, stats):
+    """Requeue the photos submitted to a dead pool for in-process preparation."""
+    logger.error(f"Report render pool failed, preparing images in process: {str(error)}")
+    if stats is not None:
+        stats['render_pool_broken'] = True
+    remaining.extendleft(reversed([receipt_path for receipt_path, _ in ahead]))
+    ahead.clear()
+    return None
@@ -1,76 +1,45 @@
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, url_for, Response, stream_with_context, abort
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 import os
+import json
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import wraps
 from . import main
 from ..ocr import ReceiptScanner
-from datetime import datetime, timedelta
+from ..utils.ocr_jobs import ocr_jobs, OCRJobQueueFull
+from ..utils.ocr_metrics import ocr_metrics
+from ..utils.ocr_cache import ocr_cache
+from ..utils.ocr_pool import ocr_pool
+from ..utils.ocr_admission import OCRBusy
+from ..utils.rate_limiter import rate_limiter
+from ..utils.ocr_profiles import PROFILES
 import threading
 
-# Better rate limiting with automatic cleanup
-class RateLimiter:
-    def __init__(self, limit=10, period=60, cleanup_interval=300):
-        self.limit = limit  # Number of requests allowed
-        self.period = period  # Time period in seconds
-        self.request_logs = {}  # identifier -> list of timestamps
-        self.lock = threading.RLock()  # Thread-safe operations
-        self.last_cleanup = datetime.now()
-        self.cleanup_interval = cleanup_interval  # Cleanup every 5 minutes by default
-    
-    def is_rate_limited(self, identifier):
-        with self.lock:
-            # Perform cleanup if needed
-            self._cleanup_if_needed()
-            
-            # Get current time
-            now = datetime.now()
-            
-            # Initialize or get existing log for this identifier
-            if identifier not in self.request_logs:
-                self.request_logs[identifier] = []
-            
-            # Remove timestamps older than the period
-            cutoff = now - timedelta(seconds=self.period)
-            self.request_logs[identifier] = [t for t in self.request_logs[identifier] if t > cutoff]
-            
-            # Check if limit is exceeded
-            if len(self.request_logs[identifier]) >= self.limit:
-                return True
-            
-            # Add current timestamp and allow request
-            self.request_logs[identifier].append(now)
-            return False
-    
-    def _cleanup_if_needed(self):
-        """Periodically clean up old entries to prevent memory leaks"""
-        now = datetime.now()
-        if (now - self.last_cleanup).total_seconds() > self.cleanup_interval:
-            cutoff = now - timedelta(seconds=self.period)
-            # Clean up all identifiers with timestamps
-            for identifier in list(self.request_logs.keys()):
-                self.request_logs[identifier] = [t for t in self.request_logs[identifier] if t > cutoff]
-                # Remove empty lists to save memory
-                if not self.request_logs[identifier]:
-                    del self.request_logs[identifier]
-            self.last_cleanup = now
-
-# Create a global rate limiter instance
-rate_limiter = RateLimiter(limit=15, period=60)  # Increased limit for company usage
+def get_client_identifier():
+    """Use user ID for authenticated users, IP for others"""
+    if current_user.is_authenticated:
+        return f"user:{current_user.id}"
+    return f"ip:{request.remote_addr}"
+
+def rate_limit_response(cost=1):
+    """Count cost hits for the client; returns a 429 response when over the limit, else None"""
+    allowed, retry_after = rate_limiter.hit(get_client_identifier(), cost=cost)
+    if allowed:
+        return None
+    response = jsonify({"error": "Rate limit exceeded. Please try again later."})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
 
 def rate_limit(f):
     """Rate limiting decorator using user ID for authenticated users and IP for others"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Use user ID for authenticated users, IP for others
-        if current_user.is_authenticated:
-            identifier = f"user:{current_user.id}"
-        else:
-            identifier = f"ip:{request.remote_addr}"
-        
-        if rate_limiter.is_rate_limited(identifier):
-            return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
+        limited = rate_limit_response()
+        if limited:
+            return limited
         
         return f(*args, **kwargs)
     return decorated_function
@@ -79,6 +48,52 @@ def allowed_file(filename):
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def get_upload_size_mb(file):
+    """Return the size of an uploaded file in MB without consuming the stream"""
+    stream = file.stream
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size / (1024 * 1024)
+
+def format_scan_result(result):
+    """Format the total to always have 2 decimal places"""
+    if result.get('total') is not None:
+        result['total'] = float(f"{result['total']:.2f}")
+    return result
+
+# Threads that fan batch scans out; the OCR itself runs on the worker pool
+batch_executor = None
+batch_executor_lock = threading.Lock()
+
+def get_batch_executor():
+    global batch_executor
+    with batch_executor_lock:
+        if batch_executor is None:
+            batch_executor = ThreadPoolExecutor(max_workers=current_app.config['OCR_BATCH_WORKERS'],
+                                                thread_name_prefix='ocr-batch')
+        return batch_executor
+
+def ocr_busy_response(error):
+    """503 telling the client when to retry, for scans refused by admission control"""
+    response = jsonify({'error': 'OCR is busy. Please try again shortly.', 'retry_after': error.retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def get_requested_profile():
+    """OCR profile from the `profile` query or form field, None for the default profile"""
+    return request.args.get('profile') or request.form.get('profile')
+
+def invalid_profile_response(profile):
+    return jsonify({'error': f"Invalid profile: {profile}. Choose one of {', '.join(PROFILES)}"}), 400
+
+def scan_receipt_job(data, filename, profile=None):
+    """Background job: scan an upload that was read into memory"""
+    scanner = ReceiptScanner(background=True)
+    return format_scan_result(scanner.scan_receipt(data, filename, profile=profile))
+
 @main.route('/ocr', methods=['POST'])
 @login_required
 def ocr():
@@ -89,9 +104,13 @@ def ocr():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
+    profile = get_requested_profile()
+    if profile and profile not in PROFILES:
+        return invalid_profile_response(profile)
+    
     try:
         scanner = ReceiptScanner()
-        result = scanner.scan_receipt(file)
+        result = scanner.scan_receipt(file, profile=profile)
         print("OCR Result:", result)
         return jsonify({
             'success': True,
@@ -100,8 +119,11 @@ def ocr():
             'merchant': result.get('merchant'),
             'currency': result.get('currency'),
             'subtotal': result.get('subtotal'),
-            'tax': result.get('tax')
+            'tax': result.get('tax'),
+            'ocr_profile': result.get('ocr_profile')
         })
+    except OCRBusy as e:
+        return ocr_busy_response(e)
     except Exception as e:
         print("OCR Error:", str(e))
         return jsonify({'error': str(e)}), 500
@@ -109,28 +131,139 @@ def ocr():
 @main.route('/process_receipt', methods=['POST'])
 @rate_limit  # Using the improved rate limiting decorator
 def process_receipt():
+    """
+    Scan a receipt for prefill.
+    
+    The optional `mode` (query or form) selects how the scan runs:
+    - sync: scan inside the request and return the result dict
+    - async: queue a background job and return 202 with its job id
+    - auto (default): sync for small uploads, async above OCR_ASYNC_THRESHOLD_MB
+    - progressive: return a quick preview scan now plus a job id for the
+      full scan, which the client polls like an async job
+    
+    The optional `profile` (fast, balanced, accurate) trades accuracy for speed.
+    """
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
         
     file = request.files['file']
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
+    
+    mode = request.args.get('mode') or request.form.get('mode', 'auto')
+    if mode not in ('sync', 'async', 'auto', 'progressive'):
+        return jsonify({'error': f"Invalid mode: {mode}"}), 400
+    
+    profile = get_requested_profile()
+    if profile and profile not in PROFILES:
+        return invalid_profile_response(profile)
+    
+    if mode == 'progressive':
+        try:
+            preview = format_scan_result(ReceiptScanner().scan_progressive(file, profile=profile,
+                                                                           owner=get_client_identifier()))
+        except OCRBusy as e:
+            return ocr_busy_response(e)
         
-    # Save the file temporarily
-    temp_dir = os.path.join(current_app.root_path, 'uploads')
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_path = os.path.join(temp_dir, f"temp_{file.filename}")
-    file.save(temp_path)
+        job_id = preview.pop('refine_job_id')
+        if job_id:
+            preview['job_id'] = job_id
+            preview['status_url'] = url_for('main.ocr_job_status', job_id=job_id)
+        return jsonify(preview)
     
-    # Process the receipt
+    if mode == 'async' or (mode == 'auto' and get_upload_size_mb(file) > current_app.config['OCR_ASYNC_THRESHOLD_MB']):
+        # Read the upload into memory - the request stream is gone once we return
+        try:
+            job_id = ocr_jobs.submit(scan_receipt_job, file.read(), file.filename, profile,
+                                     owner=get_client_identifier())
+        except OCRJobQueueFull:
+            return jsonify({'error': 'OCR queue is full. Please try again later.'}), 503
+        
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('main.ocr_job_status', job_id=job_id)
+        }), 202
+    
+    # Process the receipt in memory
     print("Processing file:", file.filename)
     scanner = ReceiptScanner()
-    result = scanner.scan_receipt(temp_path)
-    
-    # Format the total to always have 2 decimal places
-    if result.get('total') is not None:
-        result['total'] = float(f"{result['total']:.2f}")
+    try:
+        result = format_scan_result(scanner.scan_receipt(file, profile=profile))
+    except OCRBusy as e:
+        return ocr_busy_response(e)
     
     print("OCR Results:", result)
     return jsonify(result)
 
+@main.route('/ocr/jobs/<job_id>', methods=['GET'])
+def ocr_job_status(job_id):
+    """Poll a background OCR job for its status, progress and result"""
+    job = ocr_jobs.get(job_id, owner=get_client_identifier())
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@main.route('/ocr/batch', methods=['POST'])
+@login_required
+def ocr_batch():
+    """
+    Scan many receipts in parallel.
+    
+    Accepts files under `receipts[]` (or `receipt[]` like the upload form).
+    Returns {"results": [...]} in upload order, or with `stream=1` an NDJSON
+    stream with one line per file as soon as it finishes. `profile` applies
+    to every file of the batch. Every file counts against the rate limit.
+    """
+    files = request.files.getlist('receipts[]') or request.files.getlist('receipt[]')
+    files = [file for file in files if file and file.filename]
+    if not files:
+        return jsonify({'error': 'No files provided'}), 400
+    
+    max_files = current_app.config['OCR_BATCH_MAX_FILES']
+    if len(files) > max_files:
+        return jsonify({'error': f"Too many files, the maximum is {max_files}"}), 400
+    
+    profile = get_requested_profile()
+    if profile and profile not in PROFILES:
+        return invalid_profile_response(profile)
+    
+    # Charge the rate limit only for a batch that will be scanned
+    limited = rate_limit_response(cost=len(files))
+    if limited:
+        return limited
+    
+    # Read every upload now - workers can't touch the request stream
+    uploads = [(file.read(), file.filename) for file in files]
+    executor = get_batch_executor()
+    futures = {executor.submit(scan_receipt_job, data, filename, profile): (index, filename)
+               for index, (data, filename) in enumerate(uploads)}
+    
+    def entry(future):
+        index, filename = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"error": f"Receipt scanning failed: {str(e)}", "total": None, "date": None, "currency": None}
+        return {'index': index, 'filename': filename, 'result': result}
+    
+    stream = request.args.get('stream') or request.form.get('stream')
+    if stream in ('1', 'true'):
+        def generate():
+            for future in as_completed(futures):
+                yield json.dumps(entry(future)) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    results = sorted((entry(future) for future in as_completed(futures)), key=lambda item: item['index'])
+    return jsonify({'results': results})
+
+@main.route('/ocr/metrics', methods=['GET'])
+@login_required
+def ocr_metrics_snapshot():
+    """OCR stage timings, fallback counters, cache and pool stats (admins only)"""
+    if not current_user.is_admin:
+        abort(403)
+    snapshot = ocr_metrics.snapshot()
+    snapshot['cache'] = ocr_cache.stats()
+    snapshot['pool'] = {'running': ocr_pool.running, 'size': ocr_pool.size, 'recycles': ocr_pool.recycles}
+    return jsonify(snapshot)
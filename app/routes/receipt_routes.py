@@ -6,9 +6,9 @@ from datetime import datetime, timezone, timedelta
 from . import receipt
 from .. import db
 from ..models import Receipt
-from ..pdf_generator import ExpenseReportGenerator
 from pathlib import Path
 from ..utils.email import notify_reviewers_of_new_receipt
+from ..utils.report_pipeline import report_pipeline
 from functools import wraps
 
 def allowed_file(filename):
@@ -222,15 +222,7 @@ def submit_expense():
         # Get comment for other expenses
         comment = request.form.get('comment') if expense_type == 'other' else None
         
-        # Generate PDF
-        generator = ExpenseReportGenerator(current_user.name, expense_type)
-        summary_pdf_path, report_id = generator.generate_report(
-            expenses=expenses,
-            travel_details=travel_details,
-            comment=comment
-        )
-        
-        # Save receipt files and merge with summary
+        # Save receipt files; the report pipeline merges them into the PDF
         receipt_paths = []
         for file in receipt_files:
             if file and allowed_file(file.filename):
@@ -239,22 +231,20 @@ def submit_expense():
                 file.save(filepath)
                 receipt_paths.append(filepath)
         
-        # Merge summary with receipts
-        final_pdf_path = ExpenseReportGenerator.merge_with_receipts(summary_pdf_path, receipt_paths)
-        
         # Calculate total in EUR (already converted in frontend)
         total_eur = sum(float(amount) for amount in amounts)
         
         # Get travel details if it's a travel expense
         travel_purpose = request.form.get('purpose') if expense_type == 'travel' else None
         
+        # Store the submission right away; the PDF is built in the background
         receipt = Receipt(
             user_id=current_user.id,
             amount=total_eur,
             currency='EUR',
             category=expense_type,
-            status='pending',
-            file_path_db=final_pdf_path,
+            status='processing',
+            progress=0,
             comment=travel_purpose if expense_type == 'travel' else request.form.get('comment'),  # Use purpose as comment for travel
             date_submitted=current_time,
             updated_at=current_time
@@ -270,14 +260,16 @@ def submit_expense():
         db.session.add(receipt)
         db.session.commit()
         
-        # Add this block to notify reviewers
-        from app.utils.email import notify_reviewers_of_new_receipt
-        current_app.logger.info("Attempting to notify reviewers about new receipt")
-        # Get the last receipt created for this user
-        latest_receipt = Receipt.query.filter_by(user_id=current_user.id).order_by(Receipt.id.desc()).first()
-        if latest_receipt:
-            notify_reviewers_of_new_receipt(latest_receipt)
-            current_app.logger.info(f"Notification sent for receipt {latest_receipt.id}")
+        # Build the PDF and notify reviewers once it is ready
+        report_pipeline.submit(receipt.id, {
+            'user_name': current_user.name,
+            'expense_type': expense_type,
+            'expenses': expenses,
+            'travel_details': travel_details,
+            'comment': comment,
+            'receipt_paths': receipt_paths,
+        }, request.url_root)
+        current_app.logger.info(f"Receipt {receipt.id} stored, report queued")
         
         return jsonify({
             'success': True,
@@ -287,4 +279,35 @@ def submit_expense():
     except Exception as e:
         current_app.logger.error(f"Error in submit_expense: {str(e)}")
         db.session.rollback()
-        return jsonify({'success': False, 'error': str(e)}) 
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)})
+
+@receipt.route('/receipt/<int:receipt_id>/status')
+@login_required
+def receipt_status(receipt_id):
+    """Report build status of a submission, polled by the dashboard while it is processing."""
+    receipt = Receipt.query.get_or_404(receipt_id)
+    if receipt.user_id != current_user.id and not current_user.is_admin:
+        abort(403)
+    
+    # A build that stopped moving was lost (e.g. by a restart); queue it again
+    if receipt.status == 'processing' and report_pipeline.recover(receipt_id):
+        db.session.refresh(receipt)
+    
+    return jsonify({
+        'status': receipt.status,
+        'progress': (receipt.progress or 0) if receipt.status == 'processing' else 100
+    })
+
+@receipt.route('/receipt/<int:receipt_id>/retry_report', methods=['POST'])
+@login_required
+def retry_report(receipt_id):
+    """Build the report of a failed submission again."""
+    receipt = Receipt.query.get_or_404(receipt_id)
+    if receipt.user_id != current_user.id and not current_user.is_admin:
+        abort(403)
+    
+    if report_pipeline.retry(receipt_id):
+        flash('The report is being built again', 'success')
+    else:
+        flash('This report cannot be built again', 'error')
+    return redirect(url_for('main.dashboard'))
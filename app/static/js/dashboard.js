@@ -52,4 +52,21 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
     });
-}); 
\ No newline at end of file
+
+    // Poll reports that are still being built and reload once they are ready
+    document.querySelectorAll('.report-progress[data-status-url]').forEach(container => {
+        const bar = container.querySelector('.progress-bar');
+        const poll = setInterval(() => {
+            fetch(container.dataset.statusUrl)
+                .then(response => response.json())
+                .then(data => {
+                    bar.style.width = data.progress + '%';
+                    if (data.status !== 'processing') {
+                        clearInterval(poll);
+                        window.location.reload();
+                    }
+                })
+                .catch(() => clearInterval(poll));
+        }, 2000);
+    });
+});
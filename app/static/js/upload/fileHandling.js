@@ -7,66 +7,123 @@ function allowedFile(filename) {
     return allowedExtensions.includes(extension);
 }
 
+// Poll a background OCR job until it finishes
+async function waitForOCRJob(statusUrl, interval = 1000, maxAttempts = 120) {
+    for (let attempt = 0; attempt < maxAttempts; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, interval));
+        const response = await fetch(statusUrl);
+        const job = await response.json();
+        console.log('OCR job status:', job.status, job.progress);
+        
+        if (job.status === 'done') {
+            return job.result;
+        }
+        if (job.status === 'failed' || response.status === 404) {
+            console.error('OCR job failed:', job.error);
+            return null;
+        }
+    }
+    console.error('OCR job timed out');
+    return null;
+}
+
+// A refined result only replaces values that still hold what OCR put there
+function canApplyOCRValue(input, refine) {
+    return !refine || !input.value || input.value === input.dataset.ocrValue;
+}
+
+function setOCRValue(input, value, eventName) {
+    input.value = value;
+    input.dataset.ocrValue = input.value;
+    input.dispatchEvent(new Event(eventName));
+}
+
+// Fill the expense line with OCR results; refine = true for the full scan after a preview
+async function applyOCRResults(results, line, refine = false) {
+    // Update date if found
+    if (results.date) {
+        console.log('Setting date:', results.date);
+        const dateInput = line.querySelector('input[type="date"]');
+        if (dateInput && canApplyOCRValue(dateInput, refine)) {
+            setOCRValue(dateInput, results.date, 'change');
+        }
+    }
+    
+    // Update amount if found - format to 2 decimal places
+    if (results.total) {
+        // Format to exactly 2 decimal places
+        const formattedTotal = parseFloat(results.total).toFixed(2);
+        console.log('Setting amount:', formattedTotal);
+        const amountInput = line.querySelector('.amount-input');
+        if (amountInput && canApplyOCRValue(amountInput, refine)) {
+            setOCRValue(amountInput, formattedTotal, 'input');
+        }
+    }
+    
+    // Update currency if found
+    if (results.currency) {
+        console.log('Setting currency:', results.currency);
+        const currencySelect = line.querySelector('.currency-select');
+        if (currencySelect && canApplyOCRValue(currencySelect, refine)) {
+            setOCRValue(currencySelect, results.currency, 'change');
+        }
+    }
+    
+    // Update calculations
+    await updateLineCalculation(line);
+    await calculateTotal();
+}
+
 // Process receipt with OCR
 async function processReceiptOCR(file, line) {
-    console.log('Sending file for OCR processing...');
     const formData = new FormData();
     formData.append('file', file);
+    // Fill the line from a quick preview first, then from the full scan when it is ready
+    formData.append('mode', 'progressive');
 
     try {
         console.log('Sending file for OCR processing...');
-        const response = await fetch('/process_receipt', {
+        let response = await fetch('/process_receipt', {
             method: 'POST',
             body: formData
         });
         
+        // The server turns scans away when OCR is saturated - retry after the hinted delay
+        for (let attempt = 0; response.status === 503 && attempt < 3; attempt++) {
+            const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 5;
+            console.log(`OCR busy, retrying in ${retryAfter}s`);
+            await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+            response = await fetch('/process_receipt', {
+                method: 'POST',
+                body: formData
+            });
+        }
+        
         console.log('Response status:', response.status);
         const data = await response.json();
         console.log('OCR Results:', data);
         
-        // Check if we have results directly (no success wrapper)
-        const results = data.results || data;
+        // Large uploads are scanned in the background - poll for the result
+        let results = data.results || data;
+        if (response.status === 202 && data.status_url) {
+            results = await waitForOCRJob(data.status_url);
+        }
         console.log('Processing results:', results);
         
         if (results) {
-            // Update date if found
-            if (results.date) {
-                console.log('Setting date:', results.date);
-                const dateInput = line.querySelector('input[type="date"]');
-                if (dateInput) {
-                    dateInput.value = results.date;
-                    dateInput.dispatchEvent(new Event('change'));
-                }
-            }
-            
-            // Update amount if found - format to 2 decimal places
-            if (results.total) {
-                // Format to exactly 2 decimal places
-                const formattedTotal = parseFloat(results.total).toFixed(2);
-                console.log('Setting amount:', formattedTotal);
-                const amountInput = line.querySelector('.amount-input');
-                if (amountInput) {
-                    amountInput.value = formattedTotal;
-                    amountInput.dispatchEvent(new Event('input'));
-                }
-            }
-            
-            // Update currency if found
-            if (results.currency) {
-                console.log('Setting currency:', results.currency);
-                const currencySelect = line.querySelector('.currency-select');
-                if (currencySelect) {
-                    currencySelect.value = results.currency;
-                    currencySelect.dispatchEvent(new Event('change'));
-                }
-            }
-            
-            // Update calculations
-            await updateLineCalculation(line);
-            await calculateTotal();
+            await applyOCRResults(results, line);
         } else {
             console.log('No OCR results found');
         }
+        
+        // A progressive scan answers with a preview - the full scan follows as a job
+        if (response.status === 200 && data.phase === 'preview' && data.status_url) {
+            const refined = await waitForOCRJob(data.status_url);
+            console.log('Refined OCR results:', refined);
+            if (refined && !refined.error) {
+                await applyOCRResults(refined, line, true);
+            }
+        }
     } catch (error) {
         console.error('Error processing receipt:', error);
     }
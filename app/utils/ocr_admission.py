@@ -0,0 +1,121 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from .ocr_utils import setup_logger
+from .ocr_metrics import ocr_metrics
+
+# Set up logger
+logger = setup_logger(__name__)
+
+# Defaults, overridden from the app config in init_app
+DEFAULT_MAX_CONCURRENT = os.cpu_count() or 2  # OCR runs at once across all requests
+DEFAULT_MAX_WAITING = 8  # Requests allowed to queue for a slot
+DEFAULT_WAIT_TIMEOUT = 10  # Seconds a request waits before it is turned away
+DEFAULT_RETRY_AFTER = 5  # Retry-After seconds before any scan time has been measured
+
+class OCRBusy(Exception):
+    """Raised when an OCR run is not admitted; retry_after is a hint in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class OCRAdmissionController:
+    """
+    Caps how many OCR runs happen at once across all users.
+
+    Requests over the limit wait in a short bounded queue. When the queue is
+    full, or a slot does not free up within wait_timeout, OCRBusy is raised
+    so the request can be answered with 503 and a Retry-After estimate.
+    Background work (jobs, batches) waits without a bound or timeout - it is
+    already limited by its own executor.
+    """
+
+    def __init__(self, max_concurrent=DEFAULT_MAX_CONCURRENT, max_waiting=DEFAULT_MAX_WAITING,
+                 wait_timeout=DEFAULT_WAIT_TIMEOUT, metrics=ocr_metrics):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.metrics = metrics
+        self.active = 0
+        self.waiting = 0
+        self.avg_hold = None  # Moving average of seconds a slot is held
+        self.condition = threading.Condition()
+
+    def init_app(self, app):
+        """Read admission limits from the app config."""
+        self.max_concurrent = app.config.get('OCR_MAX_CONCURRENT', self.max_concurrent)
+        self.max_waiting = app.config.get('OCR_MAX_WAITING', self.max_waiting)
+        self.wait_timeout = app.config.get('OCR_ADMISSION_TIMEOUT', self.wait_timeout)
+
+    @contextmanager
+    def slot(self, background=False):
+        """
+        Hold one OCR slot for the duration of the block.
+        Args:
+            background (bool): Wait as long as needed and ignore the queue bound
+        Raises:
+            OCRBusy: If the queue is full or the wait timed out
+        """
+        self._acquire(background)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(time.perf_counter() - start)
+
+    def _acquire(self, background):
+        start = time.perf_counter()
+        with self.condition:
+            if self.active < self.max_concurrent and not self.waiting:
+                self.active += 1
+                self._publish()
+                self.metrics.observe('admission.wait', 0.0)
+                return
+
+            if not background and self.waiting >= self.max_waiting:
+                self.metrics.increment('admission.rejected.queue_full')
+                raise OCRBusy("OCR is busy, the queue is full", self.retry_after())
+
+            self.waiting += 1
+            self._publish()
+            deadline = None if background else start + self.wait_timeout
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = None if deadline is None else deadline - time.perf_counter()
+                    if remaining is not None and remaining <= 0:
+                        self.condition.notify()  # Pass on a wake-up this thread may have taken
+                        self.metrics.increment('admission.rejected.timeout')
+                        raise OCRBusy("OCR is busy, timed out waiting for a slot", self.retry_after())
+                    self.condition.wait(remaining)
+                self.active += 1
+            finally:
+                self.waiting -= 1
+                self._publish()
+
+        waited = time.perf_counter() - start
+        self.metrics.observe('admission.wait', waited)
+        logger.debug(f"OCR admitted after waiting {waited:.2f}s")
+
+    def _release(self, held):
+        with self.condition:
+            self.active -= 1
+            self.avg_hold = held if self.avg_hold is None else 0.8 * self.avg_hold + 0.2 * held
+            self._publish()
+            self.condition.notify()
+
+    def retry_after(self):
+        """Seconds until a slot is likely free for a new request, at least 1."""
+        if self.avg_hold is None:
+            return DEFAULT_RETRY_AFTER
+        queued_rounds = (self.waiting + 1) / max(1, self.max_concurrent)
+        return max(1, math.ceil(self.avg_hold * queued_rounds))
+
+    def _publish(self):
+        self.metrics.set_gauge('admission.active', self.active)
+        self.metrics.set_gauge('admission.waiting', self.waiting)
+
+# Global admission controller for OCR runs
+ocr_admission = OCRAdmissionController()
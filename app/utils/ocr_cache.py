@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from .ocr_utils import setup_logger
+
+# Set up logger
+logger = setup_logger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256  # In-memory LRU size
+DEFAULT_MAX_AGE_DAYS = 30  # Disk entries older than this are pruned
+
+class OCRResultCache:
+    """
+    Content-addressed cache for OCR results.
+
+    Results are keyed by the SHA-256 of the uploaded bytes plus the OCR
+    settings, so re-uploading the same receipt skips OCR entirely. The
+    in-memory LRU tier is per process; the on-disk tier is a directory of
+    JSON files shared by all worker processes and survives restarts.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, cache_dir=None, enabled=True):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.entries = OrderedDict()  # key -> result dict, oldest first
+        self.lock = threading.RLock()
+        self.counters = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0,
+                         'misses': 0, 'evictions': 0, 'stores': 0}
+
+    def init_app(self, app):
+        """Read cache settings from the app config."""
+        self.enabled = app.config.get('OCR_CACHE_ENABLED', self.enabled)
+        self.max_entries = app.config.get('OCR_CACHE_MAX_ENTRIES', self.max_entries)
+        self.cache_dir = app.config.get('OCR_CACHE_DIR') or os.path.join(
+            os.path.dirname(app.root_path), 'temp', 'ocr_cache')
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(data, settings):
+        """
+        Build a cache key from file content and OCR settings.
+        Args:
+            data (bytes): Raw uploaded file bytes
+            settings (dict): OCR settings that influence the result
+        Returns:
+            str: Hex digest
+        """
+        digest = hashlib.sha256(data)
+        digest.update(json.dumps(settings, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return a copy of the cached result for key, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.counters['hits'] += 1
+                self.counters['memory_hits'] += 1
+                return dict(self.entries[key])
+
+        result = self._read_disk(key)
+        with self.lock:
+            if result is None:
+                self.counters['misses'] += 1
+                return None
+            self.counters['hits'] += 1
+            self.counters['disk_hits'] += 1
+            self._remember(key, result)
+            return dict(result)
+
+    def set(self, key, result):
+        """Store a result in both tiers. Error results are never cached."""
+        if not self.enabled or result.get('error'):
+            return
+
+        with self.lock:
+            self._remember(key, dict(result))
+            self.counters['stores'] += 1
+        self._write_disk(key, result)
+
+    def stats(self):
+        """Return a snapshot of the cache counters."""
+        with self.lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self.entries)
+            return stats
+
+    def clear(self):
+        """Drop the in-memory tier (the disk tier is left alone)."""
+        with self.lock:
+            self.entries.clear()
+
+    def prune_disk(self, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        """Remove disk entries older than max_age_days. Returns the count removed."""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return 0
+
+        cutoff = time.time() - max_age_days * 86400
+        count = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for filename in files:
+                file_path = os.path.join(root, filename)
+                try:
+                    if os.path.getmtime(file_path) < cutoff:
+                        os.remove(file_path)
+                        count += 1
+                except OSError:
+                    continue
+        return count
+
+    def _remember(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _disk_path(self, key):
+        # Shard by prefix so no directory grows too large
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read OCR cache entry {key}: {str(e)}")
+            return None
+
+    def _write_disk(self, key, result):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so other processes never see partial JSON
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            os.replace(temp_path, path)
+        except (OSError, TypeError) as e:
+            logger.warning(f"Failed to write OCR cache entry {key}: {str(e)}")
+
+# Global cache used by ReceiptScanner
+ocr_cache = OCRResultCache()
@@ -0,0 +1,209 @@
+from heapq import merge
+from .ocr_utils import setup_logger
+from .ocr_patterns import TOKEN_PATTERN, DATE_GROUPS, MONTH_NAME_GROUPS, THOUSANDS_SEPARATOR, MONTHS, KEYWORDS
+from .ocr_currency import find_currency_markers, rank_currencies
+
+# Set up logger
+logger = setup_logger(__name__)
+
+MAX_AMOUNT = 100000  # Larger numbers are IDs, card numbers or postcodes, not totals
+
+def tokenize(text, markers=None):
+    """
+    Scan receipt text once and return money, date, currency and keyword tokens.
+    Args:
+        text (str): Receipt text
+        markers (list): Currency markers from find_currency_markers, found if not given
+    Returns:
+        list: Token dicts with kind, value, start, end, line and the pattern group that matched.
+              Currency tokens carry the marker's [(code, weight)] candidates as value.
+    """
+    if markers is None:
+        markers = find_currency_markers(text)
+    currency_tokens = ({'kind': 'currency', 'value': marker['candidates'], 'start': marker['start'],
+                        'end': marker['end'], 'text': marker['marker'], 'pattern': 'currency'}
+                       for marker in markers)
+    
+    tokens = []
+    line = 0
+    last_start = 0
+    for token in merge(_pattern_tokens(text), currency_tokens, key=lambda t: t['start']):
+        line += text.count('\n', last_start, token['start'])
+        last_start = token['start']
+        token['line'] = line
+        tokens.append(token)
+    return tokens
+
+def _pattern_tokens(text):
+    for match in TOKEN_PATTERN.finditer(text):
+        value = _token_value(match, text)
+        if value is None:
+            continue
+        yield {'kind': 'date' if match.lastgroup in DATE_GROUPS else match.lastgroup, 'value': value,
+               'start': match.start(), 'end': match.end(), 'text': match.group(0), 'pattern': match.lastgroup}
+
+def _token_value(match, text):
+    kind = match.lastgroup
+    group = match.group
+    if kind == 'money':
+        return parse_money(group('money'), negative=text[max(0, match.start() - 2):match.start()].strip() == '-')
+    if kind == 'keyword':
+        return ' '.join(group('keyword').lower().split())
+    if kind == 'time':
+        return group('time')
+    if kind == 'date_ymd':
+        return format_date(group('ymd_d'), group('ymd_m'), group('ymd_y'))
+    if kind == 'date_dmy':
+        day, month = int(group('dmy_d')), int(group('dmy_m'))
+        if month > 12 >= day:
+            day, month = month, day  # US month/day/year
+        return format_date(day, month, group('dmy_y'))
+    if kind == 'date_dmony':
+        return format_date(group('dmony_d'), MONTHS[group('dmony_m').lower()], group('dmony_y'))
+    if kind == 'date_mdy':
+        return format_date(group('mdy_d'), MONTHS[group('mdy_m').lower()], group('mdy_y'))
+    return None
+
+def parse_money(raw, negative=False):
+    """
+    Parse '1.234,56', '1,234.56', '12,50' or '12' into a float.
+    Returns:
+        dict: amount and whether the number had cents
+    """
+    has_cents = len(raw) > 2 and raw[-3] in '.,' or len(raw) > 1 and raw[-2] in '.,'
+    if has_cents:
+        separator = raw[-3] if raw[-3] in '.,' else raw[-2]
+        whole, cents = raw.rsplit(separator, 1)
+        amount = float(THOUSANDS_SEPARATOR.sub('', whole) + '.' + cents)
+    else:
+        amount = float(THOUSANDS_SEPARATOR.sub('', raw))
+    return {'amount': -amount if negative else amount, 'has_cents': has_cents}
+
+def format_date(day, month, year):
+    """Validate day/month/year and return YYYY-MM-DD, or None if invalid."""
+    year = str(year)
+    if len(year) == 2:
+        year = '20' + year
+    day, month, year = int(day), int(month), int(year)
+    if 1 <= day <= 31 and 1 <= month <= 12 and 2000 <= year <= 2100:
+        return f"{year}-{month:02d}-{day:02d}"
+    return None
+
+def score_candidates(tokens, currency_order=()):
+    """
+    Score every money and date token using the keywords and currency markers
+    around it. Each token is looked at once, together with its neighbours.
+    Args:
+        tokens (list): Tokens from tokenize
+        currency_order (tuple): Currency codes best first, settles markers like 'kr'
+    Returns:
+        tuple: (amounts, dates) lists of candidate dicts, best first
+    """
+    last_line = tokens[-1]['line'] if tokens else 0
+    nearest_currency = _nearest_currency(tokens, currency_order)
+    amounts, dates = [], []
+    pending = {}  # line -> summed weight of keywords since the last amount on that line
+    date_keyword_lines = set()
+
+    for i, token in enumerate(tokens):
+        if token['kind'] == 'keyword':
+            role, weight = KEYWORDS[token['value']]
+            if role == 'date':
+                date_keyword_lines.add(token['line'])
+            else:
+                # 'Summe netto' adds up to less than 'Summe' alone
+                pending[token['line']] = pending.get(token['line'], 0) + weight
+            continue
+
+        if token['kind'] == 'date':
+            score = 0
+            if token['line'] in date_keyword_lines or token['line'] - 1 in date_keyword_lines:
+                score += 3
+            if token['pattern'] in MONTH_NAME_GROUPS:
+                score += 1  # Month names are never ambiguous
+            dates.append({'value': token['value'], 'score': score, 'start': token['start']})
+            continue
+
+        if token['kind'] != 'money':
+            continue
+        amount = token['value']['amount']
+        if amount == 0 or abs(amount) > MAX_AMOUNT:
+            continue
+
+        score = pending.pop(token['line'], 0)
+        if not score and _first_on_line(tokens, i):
+            score = pending.get(token['line'] - 1, 0) // 2  # 'TOTAL' on one line, amount on the next
+
+        currency = nearest_currency.get(i)
+        if currency:
+            score += 2
+        score += 1 if token['value']['has_cents'] else -3
+        if amount < 0 and currency:
+            score += 2  # Bank statements show the debit as '-12,50 EUR'
+        if last_line:
+            score += token['line'] / last_line  # Totals sit at the bottom
+
+        amounts.append({'value': abs(amount), 'score': score, 'currency': currency, 'start': token['start']})
+
+    amounts.sort(key=lambda c: (c['score'], c['value']), reverse=True)
+    dates.sort(key=lambda c: (-c['score'], c['start']))
+    return amounts, dates
+
+def _first_on_line(tokens, i):
+    return i == 0 or tokens[i - 1]['line'] != tokens[i]['line']
+
+def _nearest_currency(tokens, currency_order):
+    """
+    Map each money token index to the currency of the nearest marker on its
+    line with no other amount in between, in one pass each way.
+    """
+    def resolve(candidates):
+        codes = [code for code, _ in candidates]
+        return min(codes, key=lambda code: currency_order.index(code) if code in currency_order else len(currency_order))
+    
+    left, right = {}, {}
+    for indices, found in ((range(len(tokens)), left), (range(len(tokens) - 1, -1, -1), right)):
+        marker = None
+        for i in indices:
+            token = tokens[i]
+            if marker is not None and tokens[marker]['line'] != token['line']:
+                marker = None
+            if token['kind'] == 'currency':
+                marker = i
+            elif token['kind'] == 'money':
+                if marker is not None:
+                    found[i] = marker
+                marker = None
+    
+    nearest = {}
+    for i in left.keys() | right.keys():
+        candidates = [j for j in (left.get(i), right.get(i)) if j is not None]
+        j = min(candidates, key=lambda j: abs(tokens[j]['start'] - tokens[i]['start']))
+        nearest[i] = resolve(tokens[j]['value'])
+    return nearest
+
+def extract_fields(text):
+    """
+    Extract currency, total and date from receipt text in a single pass.
+    Returns:
+        dict: currency, total and date (None when not found)
+    """
+    markers = find_currency_markers(text)
+    currencies = rank_currencies(markers)
+    tokens = tokenize(text, markers)
+    amounts, dates = score_candidates(tokens, tuple(c['code'] for c in currencies))
+    logger.debug(f"Currency candidates: {currencies[:3]}")
+    logger.debug(f"Amount candidates: {amounts[:3]}")
+    logger.debug(f"Date candidates: {dates[:3]}")
+    
+    # The marker next to the total beats the overall ranking
+    currency = None
+    if amounts and amounts[0]['currency']:
+        currency = amounts[0]['currency']
+    elif currencies:
+        currency = currencies[0]['code']
+    return {
+        'currency': currency,
+        'total': round(amounts[0]['value'], 2) if amounts else None,
+        'date': dates[0]['value'] if dates else None,
+    }
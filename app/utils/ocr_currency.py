@@ -0,0 +1,70 @@
+import re
+from .ocr_patterns import alternation
+
+# Currencies offered in the upload form (static/js/currency.js), in the
+# order used to break ties. Markers are matched case-insensitively; the
+# weight says how strongly a marker points at the currency.
+CURRENCIES = {
+    'EUR': {'€': 3, 'eur': 3, 'euro': 2, 'euros': 2},
+    'USD': {'$': 2, 'usd': 3, 'us$': 3, 'dollar': 2, 'dollars': 2},
+    'GBP': {'£': 3, 'gbp': 3, 'sterling': 2},
+    'CHF': {'chf': 3, 'sfr': 2, 'franken': 1},
+    'NOK': {'nok': 3, 'kr': 1, 'kroner': 1},
+    'DKK': {'dkk': 3, 'kr': 1, 'kroner': 1},
+    'SEK': {'sek': 3, 'kr': 1, 'kronor': 2},
+    'HUF': {'huf': 3, 'ft': 2, 'forint': 2},
+    'AED': {'aed': 3, 'د.إ': 3, 'dhs': 2, 'dirham': 2},
+}
+CURRENCY_ORDER = tuple(CURRENCIES)
+
+# marker -> [(code, weight), ...]; 'kr' belongs to three currencies
+MARKERS = {}
+for code, markers in CURRENCIES.items():
+    for marker, weight in markers.items():
+        MARKERS.setdefault(marker, []).append((code, weight))
+
+# Every marker in one prefix-tree alternation, longest first. The text is
+# lowercased before the scan, which is much cheaper than IGNORECASE
+CURRENCY_MARKER_PATTERN = re.compile(alternation(MARKERS))
+
+def find_currency_markers(text):
+    """
+    Find every currency marker in text with one scan of the compiled pattern.
+    Letter markers must stand alone ('eur' in 'teuro' does not count), but
+    may run into digits ('EUR12,50', '12kr'). Where markers overlap the
+    longest one starting first is kept ('$' in 'us$' is not reported).
+    Returns:
+        list: Marker dicts with start, end, marker and candidates [(code, weight)], in text order
+    """
+    text_lower = text.lower()
+    markers = []
+    match = CURRENCY_MARKER_PATTERN.search(text_lower)
+    while match:
+        start, end = match.span()
+        marker = match.group(0)
+        if ((marker[0].isalpha() and start and text_lower[start - 1].isalpha())
+                or (marker[-1].isalpha() and end < len(text_lower) and text_lower[end].isalpha())):
+            # Shorter markers at this position are cut off by a letter too; one may start inside it ('bus$')
+            match = CURRENCY_MARKER_PATTERN.search(text_lower, start + 1)
+            continue
+        markers.append({'start': start, 'end': end, 'marker': marker, 'candidates': MARKERS[marker]})
+        match = CURRENCY_MARKER_PATTERN.search(text_lower, end)
+    return markers
+
+def rank_currencies(markers):
+    """
+    Rank currencies by the summed weight of their markers.
+    Returns:
+        list: Candidate dicts with code, score and positions, best first
+    """
+    ranked = {}
+    for marker in markers:
+        for code, weight in marker['candidates']:
+            candidate = ranked.setdefault(code, {'code': code, 'score': 0, 'positions': []})
+            candidate['score'] += weight
+            candidate['positions'].append(marker['start'])
+    return sorted(ranked.values(), key=lambda c: (-c['score'], CURRENCY_ORDER.index(c['code'])))
+
+def detect_currencies(text):
+    """Ranked currency candidates for a receipt text, best first."""
+    return rank_currencies(find_currency_markers(text))
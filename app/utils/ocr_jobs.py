@@ -0,0 +1,248 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from .ocr_utils import setup_logger
+
+# Set up logger
+logger = setup_logger(__name__)
+
+# Defaults, overridden from the app config in init_app
+DEFAULT_MAX_WORKERS = 2  # Concurrent background OCR runs
+DEFAULT_MAX_PENDING = 20  # Queued + running jobs before new ones are refused
+DEFAULT_RESULT_TTL = 600  # Seconds a finished job stays pollable
+
+class OCRJobQueueFull(Exception):
+    """Raised when the background OCR queue cannot take another job."""
+
+ACTIVE_STATUSES = ('queued', 'running')
+LOST_JOB_ERROR = 'The OCR job was lost, please scan the receipt again'
+
+class MemoryJobStore:
+    """Per-process job table; a poll must reach the process that queued the job."""
+
+    def __init__(self):
+        self.jobs = {}  # job_id -> job dict
+        self.lock = threading.Lock()
+
+    def add(self, job, max_pending):
+        with self.lock:
+            active = sum(1 for existing in self.jobs.values() if existing['status'] in ACTIVE_STATUSES)
+            if active >= max_pending:
+                raise OCRJobQueueFull(f"{active} OCR jobs already pending")
+            self.jobs[job['id']] = dict(job)
+
+    def update(self, job_id, fields):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job:
+                job.update(fields)
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def prune(self, finished_before, lost_before):
+        with self.lock:
+            for job_id, job in list(self.jobs.items()):
+                if job['status'] in ACTIVE_STATUSES:
+                    if job['created_at'] < lost_before:
+                        job.update(status='failed', progress=100, error=LOST_JOB_ERROR, finished_at=time.time())
+                elif job['finished_at'] < finished_before:
+                    del self.jobs[job_id]
+
+class SQLiteJobStore:
+    """
+    Job table in a SQLite file shared by every worker process on the host,
+    so a poll can land on any worker. Jobs are stored as JSON next to the
+    indexed columns used for the pending count and pruning; adding a job
+    counts and inserts in one IMMEDIATE transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("""CREATE TABLE IF NOT EXISTS ocr_jobs (
+                id TEXT PRIMARY KEY, status TEXT, created_at REAL, finished_at REAL, data TEXT)""")
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_ocr_jobs_status ON ocr_jobs (status, created_at)')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    @property
+    def conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = self._connect()
+            conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _write(self, conn, job):
+        conn.execute('INSERT OR REPLACE INTO ocr_jobs VALUES (?, ?, ?, ?, ?)',
+                     (job['id'], job['status'], job['created_at'], job['finished_at'],
+                      json.dumps(job, default=str)))
+
+    def add(self, job, max_pending):
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            active, = conn.execute('SELECT COUNT(*) FROM ocr_jobs WHERE status IN (?, ?)',
+                                   ACTIVE_STATUSES).fetchone()
+            if active >= max_pending:
+                raise OCRJobQueueFull(f"{active} OCR jobs already pending")
+            self._write(conn, job)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def update(self, job_id, fields):
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT data FROM ocr_jobs WHERE id = ?', (job_id,)).fetchone()
+            if row:
+                job = json.loads(row[0])
+                job.update(fields)
+                self._write(conn, job)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def get(self, job_id):
+        row = self.conn.execute('SELECT data FROM ocr_jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def prune(self, finished_before, lost_before):
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM ocr_jobs WHERE finished_at < ?', (finished_before,))
+            # Jobs of a worker that exited never finish; fail them so they stop counting as pending
+            lost = conn.execute('SELECT data FROM ocr_jobs WHERE status IN (?, ?) AND created_at < ?',
+                                (*ACTIVE_STATUSES, lost_before)).fetchall()
+            for row in lost:
+                job = json.loads(row[0])
+                job.update(status='failed', progress=100, error=LOST_JOB_ERROR, finished_at=time.time())
+                self._write(conn, job)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+class OCRJobManager:
+    """
+    Runs OCR jobs on a bounded background executor and keeps their status
+    so clients can poll for the result instead of holding a web worker.
+
+    Jobs run in the process that queued them, their status lives in a
+    pluggable store. The memory store only answers polls in that process;
+    the SQLite store shares jobs between worker processes, so any worker can
+    answer a poll and max_pending holds for the whole server. Jobs still
+    queued or running after result_ttl are marked failed, which covers jobs
+    of a worker that exited.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, max_pending=DEFAULT_MAX_PENDING,
+                 result_ttl=DEFAULT_RESULT_TTL, store=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.store = store or MemoryJobStore()
+        self.lock = threading.RLock()
+        self._executor = None
+
+    def init_app(self, app):
+        """Read executor limits and the job store from the app config."""
+        self.max_workers = app.config.get('OCR_JOB_WORKERS', self.max_workers)
+        self.max_pending = app.config.get('OCR_JOB_MAX_PENDING', self.max_pending)
+        self.result_ttl = app.config.get('OCR_JOB_RESULT_TTL', self.result_ttl)
+
+        testing = os.environ.get('FLASK_ENV') == 'testing' or app.config.get('TESTING', False)
+        if app.config.get('OCR_JOB_BACKEND') == 'sqlite' and not testing:
+            path = app.config.get('OCR_JOB_SQLITE_PATH') or os.path.join(
+                os.path.dirname(app.root_path), 'temp', 'ocr_jobs.sqlite')
+            self.store = SQLiteJobStore(path)
+            logger.info(f"OCR jobs shared through {path}")
+        else:
+            self.store = MemoryJobStore()
+
+    @property
+    def executor(self):
+        with self.lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='ocr-job')
+            return self._executor
+
+    def submit(self, func, *args, owner=None, **kwargs):
+        """
+        Queue func(*args, **kwargs) as a background job.
+        Args:
+            func: Callable returning the result dict
+            owner (str): Identifier allowed to read the job status
+        Returns:
+            str: Job id
+        Raises:
+            OCRJobQueueFull: If max_pending jobs are already queued or running
+        """
+        self._prune()
+        job_id = uuid.uuid4().hex
+        self.store.add({
+            'id': job_id,
+            'owner': owner,
+            'status': 'queued',
+            'progress': 0,
+            'result': None,
+            'error': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+        }, self.max_pending)
+
+        self.executor.submit(self._run, job_id, func, args, kwargs)
+        logger.debug(f"Queued OCR job {job_id}")
+        return job_id
+
+    def update(self, job_id, **fields):
+        """Update fields of a job, e.g. progress from inside the job."""
+        self.store.update(job_id, fields)
+
+    def get(self, job_id, owner=None):
+        """
+        Return a snapshot of a job, or None if it is unknown, expired or
+        belongs to another owner.
+        """
+        job = self.store.get(job_id)
+        if job is None or (owner is not None and job['owner'] != owner):
+            return None
+        return {key: value for key, value in job.items() if key != 'owner'}
+
+    def _run(self, job_id, func, args, kwargs):
+        self.update(job_id, status='running', progress=10, started_at=time.time())
+        try:
+            result = func(*args, **kwargs)
+            self.update(job_id, status='done', progress=100, result=result, finished_at=time.time())
+        except Exception as e:
+            logger.error(f"OCR job {job_id} failed: {str(e)}", exc_info=True)
+            self.update(job_id, status='failed', progress=100, error=str(e), finished_at=time.time())
+
+    def _prune(self):
+        """Drop finished jobs older than the result TTL and fail jobs that never finished."""
+        cutoff = time.time() - self.result_ttl
+        self.store.prune(finished_before=cutoff, lost_before=cutoff)
+
+# Global job manager used by the OCR routes
+ocr_jobs = OCRJobManager()
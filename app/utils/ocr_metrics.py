@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+class MetricsRegistry:
+    """
+    Process-wide OCR metrics: counters, gauges and timing summaries.
+    Cheap enough to update on every scan; read via snapshot().
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = Counter()
+        self.gauges = {}
+        self.timings = {}  # name -> {'count', 'total', 'max'}
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, name, seconds):
+        with self.lock:
+            summary = self.timings.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            summary['count'] += 1
+            summary['total'] += seconds
+            summary['max'] = max(summary['max'], seconds)
+
+    def snapshot(self):
+        """Return a JSON-serializable copy of all metrics."""
+        with self.lock:
+            timings = {
+                name: {
+                    'count': summary['count'],
+                    'avg': round(summary['total'] / summary['count'], 4),
+                    'max': round(summary['max'], 4),
+                }
+                for name, summary in self.timings.items()
+            }
+            return {'counters': dict(self.counters), 'gauges': dict(self.gauges), 'timings': timings}
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.timings.clear()
+
+class ScanMetrics:
+    """Stage timings and counters for a single scan."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {}  # stage -> seconds
+        self.counters = Counter()
+
+    def elapsed(self):
+        """Seconds since the scan started."""
+        return time.perf_counter() - self.started
+
+    def restart(self, stage):
+        """
+        Start the scan clock (and its time budget) now, recording the time
+        since the previous start as stage - e.g. the wait for an OCR slot.
+        """
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self.started
+        self.started = now
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block; repeated stages (e.g. per PDF page) accumulate."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def attach(self, result):
+        """Add timings and counters to a result dict and return it."""
+        result['timings'] = {name: round(seconds, 4) for name, seconds in self.timings.items()}
+        result['counters'] = dict(self.counters)
+        return result
+
+    def publish(self, registry):
+        """Fold this scan into a process-wide registry."""
+        for name, seconds in self.timings.items():
+            registry.observe(f"stage.{name}", seconds)
+        for name, value in self.counters.items():
+            registry.increment(name, value)
+
+# Global registry for the OCR pipeline
+ocr_metrics = MetricsRegistry()
@@ -0,0 +1,98 @@
+"""
+Compiled regular expressions shared by the OCR extractors.
+
+Everything here is built once at import, so no call pays for re's pattern
+cache lookup or a compile. Cascades that stop at the first hit (the region
+date lookup) keep one pattern per step; the receipt tokenizer, which has to
+find every token anyway, is one alternation with named groups.
+"""
+import re
+
+MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'jun': 6, 'jul': 7, 'aug': 8,
+    'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+    'januar': 1, 'februar': 2, 'märz': 3, 'maerz': 3, 'mai': 5, 'juni': 6, 'juli': 7,
+    'oktober': 10, 'okt': 10, 'dezember': 12, 'dez': 12,
+}
+
+# Keyword -> (role, weight). Total keywords pull the amount after them up,
+# 'other' keywords (subtotals, tax, change) push it down.
+KEYWORDS = {
+    'total': ('total', 6), 'grand total': ('total', 7), 'totaal': ('total', 6),
+    'amount due': ('total', 7), 'balance due': ('total', 7), 'total due': ('total', 7),
+    'summe': ('total', 6), 'gesamt': ('total', 6), 'gesamtbetrag': ('total', 7),
+    'gesamtbrutto': ('total', 7), 'endbetrag': ('total', 7), 'zu zahlen': ('total', 7),
+    'betrag': ('total', 3), 'amount': ('total', 3), 'balance': ('total', 3), 'sum': ('total', 3),
+    'zahlung': ('total', 3), 'ec-zahlung': ('total', 4), 'kartenzahlung': ('total', 4),
+    'kredit': ('total', 2), 'bar': ('total', 2), 'zw-summe': ('total', 2),
+    'totalt': ('total', 6), 'att betala': ('total', 7), 'å betale': ('total', 7), 'i alt': ('total', 6),
+    'at betale': ('total', 7), 'összesen': ('total', 6), 'fizetendő': ('total', 7),
+    'subtotal': ('other', -5), 'sub-total': ('other', -5), 'zwischensumme': ('other', -5),
+    'mwst': ('other', -5), 'ust': ('other', -5), 'tax': ('other', -5), 'vat': ('other', -5),
+    'netto': ('other', -4), 'rückgeld': ('other', -6), 'change': ('other', -6),
+    'gegeben': ('other', -4), 'tip': ('other', -3), 'trinkgeld': ('other', -3),
+    'date': ('date', 3), 'datum': ('date', 3), 'date paid': ('date', 4), 'paid on': ('date', 4),
+    'payment date': ('date', 4), 'invoice date': ('date', 4), 'rechnungsdatum': ('date', 4),
+    'belegdatum': ('date', 4), 'wertstellungsdatum': ('date', 4),
+}
+
+def alternation(words):
+    """
+    Alternation of literal words factored into a prefix tree, so the regex
+    engine compares each character once instead of trying every word in
+    turn. Longer words win ('gesamtbetrag' over 'gesamt') because every
+    optional continuation is greedy.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if '' in node:
+            return '(?:' + '|'.join(branches) + ')?'
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return build(trie)
+
+# Receipt tokenizer: one left-to-right scan. Dates and times come before
+# money so '12.03.2024' or '14:17' is never read as an amount. Currency
+# markers are found separately by find_currency_markers in ocr_currency. The leading
+# lookahead rejects positions inside words before any alternative is tried.
+TOKEN_PATTERN = re.compile(rf"""
+    (?=\d|\b[^\W\d_])
+    (?:
+    (?P<date_ymd>(?<![\d.,])(?P<ymd_y>\d{{4}})[/.-](?P<ymd_m>\d{{1,2}})[/.-](?P<ymd_d>\d{{1,2}})(?!\d))
+  | (?P<date_dmy>(?<![\d.,])(?P<dmy_d>\d{{1,2}})(?:[/-]|\.\s?)(?P<dmy_m>\d{{1,2}})(?:[/-]|\.\s?)(?P<dmy_y>\d{{4}}|\d{{2}})(?![\d,]|\.\d))
+  | (?P<date_dmony>(?<![\d.,])(?P<dmony_d>\d{{1,2}})\.?[\s.-]?(?P<dmony_m>{alternation(MONTHS)})\b\.?[\s.-]?(?P<dmony_y>\d{{4}}|\d{{2}})(?!\d))
+  | (?P<date_mdy>\b(?P<mdy_m>{alternation(MONTHS)})\b\.?[\s.-]?(?P<mdy_d>\d{{1,2}})(?:st|nd|rd|th)?,?[\s.-]?(?P<mdy_y>\d{{4}})(?!\d))
+  | (?P<time>(?<![\d.,])\d{{1,2}}:\d{{2}}(?::\d{{2}})?(?!\d))
+  | (?P<money>(?<![\d.,])(?:\d{{1,3}}(?:[.,]\d{{3}})+(?:[.,]\d{{2}})?|\d+(?:[.,]\d{{1,2}})?)(?![\d]|[.,]\d))
+  | (?P<keyword>\b(?:{alternation(KEYWORDS)})\b)
+    )
+""", re.IGNORECASE | re.VERBOSE)
+
+# Token groups that hold a date, and those that spell the month out
+DATE_GROUPS = ('date_ymd', 'date_dmy', 'date_dmony', 'date_mdy')
+MONTH_NAME_GROUPS = ('date_dmony', 'date_mdy')
+
+THOUSANDS_SEPARATOR = re.compile(r'[.,]')
+
+# Dates near the bottom of German card receipts, tried in order of reliability:
+# 'BEGINN 12.03.24', a plain date, or '06/2023 14:17' (month/year only)
+BEGINN_DATE_PATTERN = re.compile(r'BEGINN\s+(\d{1,2})[/.-](\d{1,2})[/.-](\d{2,4})', re.IGNORECASE)
+PLAIN_DATE_PATTERN = re.compile(r'(\d{1,2})[/.-](\d{1,2})[/.-](\d{2,4})')
+MONTH_YEAR_PATTERN = re.compile(r'[^\d](\d{2})[/.-](\d{4})\s+\d{1,2}:\d{1,2}')
+
+BEGINN_DAY_PATTERN = re.compile(r'BEGINN\s+(\d{1,2})[/.-]')
+DAY_NUMBER_PATTERN = re.compile(r'\b(\d{1,2})\b')
+
+# Words for the language probe
+WORD_PATTERN = re.compile(r'[a-zäöüß]+')
@@ -0,0 +1,223 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import pytesseract
+from .ocr_utils import setup_logger, get_peak_rss_mb
+
+# tesserocr talks to libtesseract directly, so a worker loads the
+# traineddata once and keeps it. Without it workers fall back to pytesseract.
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Set up logger
+logger = setup_logger(__name__)
+
+DEFAULT_LANGS = ('eng', 'deu', 'eng+deu')  # Models loaded at worker start
+DEFAULT_MAX_JOBS = 200  # Jobs before a worker is replaced
+DEFAULT_MAX_MEMORY_MB = 512  # Worker peak RSS that triggers a recycle
+
+TIMEOUT_GRACE_SECONDS = 2  # Extra wait for a worker's own timeout before its pool is torn down
+
+DATA_KEYS = ('text', 'left', 'top', 'width', 'height', 'conf', 'block_num', 'par_num', 'line_num')
+
+class OCRTimeout(Exception):
+    """Raised when an OCR call does not finish within its timeout."""
+
+# Per-worker tesserocr API handles, keyed by language
+_apis = {}
+
+def _get_api(lang):
+    api = _apis.get(lang)
+    if api is None:
+        api = tesserocr.PyTessBaseAPI(lang=lang)
+        _apis[lang] = api
+    return api
+
+def _init_worker(langs):
+    """Load the language models once when the worker process starts."""
+    if tesserocr is not None:
+        for lang in langs:
+            _get_api(lang)
+
+def _tesserocr_recognize(api, image, timeout):
+    """Recognize an image, letting tesseract cancel itself after timeout seconds."""
+    api.SetImage(image)
+    if not api.Recognize(timeout=int(timeout * 1000) if timeout else 0):
+        raise OCRTimeout(f"Tesseract cancelled after {timeout:.1f}s")
+
+def _tesserocr_image_to_data(api, image, timeout=None):
+    """Word-level output in the same shape as pytesseract.image_to_data(output_type=DICT)."""
+    _tesserocr_recognize(api, image, timeout)
+    data = {key: [] for key in DATA_KEYS}
+    level = tesserocr.RIL.WORD
+    block_num = par_num = line_num = 0
+
+    for word in tesserocr.iterate_level(api.GetIterator(), level):
+        if word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+            block_num, par_num, line_num = block_num + 1, 0, 0
+        if word.IsAtBeginningOf(tesserocr.RIL.PARA):
+            par_num, line_num = par_num + 1, 0
+        if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+            line_num += 1
+
+        text = word.GetUTF8Text(level)
+        box = word.BoundingBox(level)
+        if not text or box is None:
+            continue
+        left, top, right, bottom = box
+        for key, value in zip(DATA_KEYS, (text, left, top, right - left, bottom - top,
+                                          word.Confidence(level), block_num, par_num, line_num)):
+            data[key].append(value)
+
+    return data
+
+def _run_ocr(image, lang, output, timeout=None):
+    """
+    Worker task: OCR a PIL image.
+    Returns:
+        tuple: (result, peak_rss_mb) where result is a data dict or a string
+    """
+    if tesserocr is not None:
+        api = _get_api(lang)
+        if output == 'data':
+            result = _tesserocr_image_to_data(api, image, timeout)
+        else:
+            _tesserocr_recognize(api, image, timeout)
+            result = api.GetUTF8Text()
+    else:
+        result = _run_local(image, lang, output, timeout)
+    return result, get_peak_rss_mb()
+
+def _run_local(image, lang, output, timeout=None):
+    """OCR in the calling process with a tesseract subprocess, killed after timeout seconds."""
+    try:
+        if output == 'data':
+            return pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT,
+                                             timeout=timeout or 0)
+        return pytesseract.image_to_string(image, lang=lang, timeout=timeout or 0)
+    except RuntimeError as e:
+        # pytesseract reports a killed subprocess as RuntimeError('Tesseract process timeout')
+        if 'timeout' in str(e).lower():
+            raise OCRTimeout(f"Tesseract killed after {timeout:.1f}s") from e
+        raise
+
+class TesseractPool:
+    """
+    Pool of long-lived OCR worker processes.
+
+    Each worker loads the language models once and then takes images over
+    IPC. Workers are replaced after max_jobs_per_worker jobs, and the pool
+    is recycled when a worker's peak memory exceeds max_memory_mb.
+
+    After init_app the workers are started on the first OCR call, so CLI
+    commands that create the app (flask db upgrade, manage-files) never
+    spawn them. Without a pool (tests, scripts, OCR_POOL_SIZE=0) OCR runs
+    in the calling process.
+    """
+
+    def __init__(self, size=0, max_jobs_per_worker=DEFAULT_MAX_JOBS,
+                 max_memory_mb=DEFAULT_MAX_MEMORY_MB, langs=DEFAULT_LANGS):
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_memory_mb = max_memory_mb
+        self.langs = tuple(langs)
+        self.recycles = 0
+        self.autostart = False
+        self.lock = threading.Lock()
+        self._executor = None
+
+    def init_app(self, app):
+        """Read pool settings from the app config; the workers start on first use."""
+        self.size = app.config.get('OCR_POOL_SIZE', self.size)
+        self.max_jobs_per_worker = app.config.get('OCR_POOL_MAX_JOBS', self.max_jobs_per_worker)
+        self.max_memory_mb = app.config.get('OCR_POOL_MAX_MEMORY_MB', self.max_memory_mb)
+
+        testing = os.environ.get('FLASK_ENV') == 'testing' or app.config.get('TESTING', False)
+        self.autostart = self.size > 0 and not testing
+
+    @property
+    def running(self):
+        return self._executor is not None
+
+    def start(self):
+        """Start the workers; each loads the language models in _init_worker."""
+        with self.lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+                logger.info(f"Started OCR pool with {self.size} workers "
+                            f"({'tesserocr' if tesserocr is not None else 'pytesseract'})")
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    def image_to_data(self, image, lang, timeout=None):
+        """
+        Word-level OCR output as a pytesseract-style dict.
+        Raises:
+            OCRTimeout: If tesseract did not finish within timeout seconds
+        """
+        return self._run(image, lang, 'data', timeout)
+
+    def image_to_string(self, image, lang, timeout=None):
+        """Plain OCR text; raises OCRTimeout like image_to_data."""
+        return self._run(image, lang, 'string', timeout)
+
+    def _run(self, image, lang, output, timeout=None):
+        executor = self._executor
+        if executor is None and self.autostart:
+            self.start()
+            executor = self._executor
+        if executor is None:
+            return _run_local(image, lang, output, timeout)
+
+        future = executor.submit(_run_ocr, image, lang, output, timeout)
+        try:
+            result, rss_mb = future.result(timeout=timeout + TIMEOUT_GRACE_SECONDS if timeout else None)
+        except FutureTimeoutError:
+            # The worker ignored its own timeout; don't let it hold a slot any longer
+            if not future.cancel():
+                logger.error(f"OCR worker stuck past {timeout:.1f}s, replacing the pool")
+                self._recycle(executor, terminate=True)
+            raise OCRTimeout(f"OCR worker did not answer within {timeout:.1f}s")
+        except BrokenProcessPool:
+            logger.error("OCR pool broke, recycling and running this job locally")
+            self._recycle(executor)
+            return _run_local(image, lang, output, timeout)
+
+        if rss_mb is not None and rss_mb > self.max_memory_mb:
+            logger.info(f"OCR worker reached {rss_mb}MB, recycling pool")
+            self._recycle(executor)
+        return result
+
+    def _recycle(self, old_executor, terminate=False):
+        """
+        Swap in fresh workers. Jobs already running on the old ones still
+        finish, unless terminate is set - then the old workers are killed.
+        """
+        with self.lock:
+            if self._executor is not old_executor:
+                return  # Another thread already recycled
+            self._executor = self._new_executor()
+            self.recycles += 1
+        if terminate:
+            # ProcessPoolExecutor has no public way to stop a running task
+            for process in list((old_executor._processes or {}).values()):
+                process.terminate()
+        old_executor.shutdown(wait=False)
+
+    def _new_executor(self):
+        # max_tasks_per_child needs the spawn start method
+        return ProcessPoolExecutor(max_workers=self.size,
+                                   mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(self.langs,),
+                                   max_tasks_per_child=self.max_jobs_per_worker)
+
+# Global pool used by the OCR pipeline
+ocr_pool = TesseractPool()
@@ -0,0 +1,156 @@
+"""
+Image cleanup before tesseract, vectorized with NumPy.
+
+Phone photos of receipts come with uneven lighting, a tilted camera and a
+table around the paper. Tesseract's own global binarization handles that
+poorly, so the image is cropped to the paper, binarized against the local
+mean brightness and deskewed before OCR. Every step works on whole arrays;
+there are no per-pixel Python loops.
+
+NumPy is optional: without it available() is False and the OCR pipeline
+skips this stage.
+"""
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+THRESHOLD_BLOCK_FRACTION = 1 / 40  # Local window for adaptive thresholding, relative to the short side
+THRESHOLD_MIN_BLOCK = 15  # Pixels, keeps the window larger than a character stroke
+THRESHOLD_OFFSET = 10  # Grey levels a pixel must be darker than its surroundings to count as ink
+MAX_SKEW_DEGREES = 6  # Skew angles searched in each direction
+SKEW_STEP_DEGREES = 0.25
+MIN_DESKEW_DEGREES = 0.5  # Smaller angles are left alone, tesseract copes with them
+SKEW_SAMPLE_POINTS = 40000  # Ink pixels used to estimate the skew
+PAPER_ROW_FRACTION = 0.5  # Share of bright pixels that makes a row or column part of the paper
+MIN_PAPER_AREA = 0.2  # Crops smaller than this share of the image are treated as misdetections
+CROP_MARGIN = 8  # Pixels kept around the paper
+
+def available():
+    """Whether the preprocessing stage can run (NumPy is installed)."""
+    return np is not None
+
+def preprocess_image(image):
+    """
+    Crop, binarize and deskew a receipt image for OCR.
+    Args:
+        image (PIL.Image.Image): Decoded, resized image
+    Returns:
+        tuple: (PIL.Image.Image in mode L, info dict with 'cropped' and 'angle')
+    """
+    gray = np.asarray(image.convert('L'), dtype=np.uint8)
+    left, top, right, bottom = find_paper_box(gray)
+    cropped = (right - left, bottom - top) != (gray.shape[1], gray.shape[0])
+    gray = gray[top:bottom, left:right]
+
+    binary = adaptive_threshold(gray)
+    angle = estimate_skew(binary)
+
+    result = Image.fromarray(binary, mode='L')
+    if abs(angle) >= MIN_DESKEW_DEGREES:
+        result = result.rotate(angle, resample=Image.Resampling.BILINEAR, expand=True, fillcolor=255)
+    else:
+        angle = 0.0
+    return result, {'cropped': cropped, 'angle': angle}
+
+def otsu_threshold(gray):
+    """Grey level that best separates a uint8 image into two classes (Otsu's method)."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight_low = hist.cumsum()
+    weight_high = weight_low[-1] - weight_low
+    mass = (hist * levels).cumsum()
+    mean_low = mass / np.maximum(weight_low, 1)
+    mean_high = (mass[-1] - mass) / np.maximum(weight_high, 1)
+    return int((weight_low * weight_high * (mean_low - mean_high) ** 2).argmax())
+
+def find_paper_box(gray):
+    """
+    Bounding box of the bright paper in a photo.
+    Returns:
+        tuple: (left, top, right, bottom), the whole image if no clear paper region is found
+    """
+    height, width = gray.shape
+    paper = gray > otsu_threshold(gray)
+    rows = np.flatnonzero(paper.mean(axis=1) > PAPER_ROW_FRACTION)
+    cols = np.flatnonzero(paper.mean(axis=0) > PAPER_ROW_FRACTION)
+    if not len(rows) or not len(cols):
+        return 0, 0, width, height
+
+    top, bottom = max(0, rows[0] - CROP_MARGIN), min(height, rows[-1] + 1 + CROP_MARGIN)
+    left, right = max(0, cols[0] - CROP_MARGIN), min(width, cols[-1] + 1 + CROP_MARGIN)
+    if (bottom - top) * (right - left) < MIN_PAPER_AREA * height * width:
+        return 0, 0, width, height
+    return int(left), int(top), int(right), int(bottom)
+
+def adaptive_threshold(gray, block=None, offset=THRESHOLD_OFFSET):
+    """
+    Binarize against the mean of each pixel's neighbourhood, so shadows and
+    uneven lighting don't swallow text. The window sum is separable: a
+    running sum down the columns, then one along the rows, which makes the
+    cost independent of the window size. Sums stay within int32 for any
+    block up to the image size at OCR resolution, and at most three int32
+    copies of the image are alive at once.
+    Returns:
+        numpy.ndarray: uint8 array, 0 for ink and 255 for background
+    """
+    height, width = gray.shape
+    if block is None:
+        block = max(THRESHOLD_MIN_BLOCK, int(min(height, width) * THRESHOLD_BLOCK_FRACTION))
+    radius = block // 2
+
+    y0 = np.clip(np.arange(height) - radius, 0, height)
+    y1 = np.clip(np.arange(height) + radius + 1, 0, height)
+    x0 = np.clip(np.arange(width) - radius, 0, width)
+    x1 = np.clip(np.arange(width) + radius + 1, 0, width)
+
+    # Vertical window sums from a running sum down each column
+    running = np.zeros((height + 1, width), dtype=np.int32)
+    np.cumsum(gray, axis=0, dtype=np.int32, out=running[1:])
+    sums = running.take(y1, axis=0)
+    sums -= running.take(y0, axis=0)
+
+    # Horizontal window sums of those
+    running = np.zeros((height, width + 1), dtype=np.int32)
+    np.cumsum(sums, axis=1, out=running[:, 1:])
+    np.take(running, x1, axis=1, out=sums)
+    sums -= running.take(x0, axis=1)
+    del running
+
+    # gray < mean - offset, without dividing every pixel
+    scaled = gray.astype(np.int32)
+    scaled += offset
+    scaled *= (y1 - y0).astype(np.int32)[:, None]
+    scaled *= (x1 - x0).astype(np.int32)[None, :]
+    binary = np.full((height, width), 255, dtype=np.uint8)
+    binary[scaled < sums] = 0
+    return binary
+
+def estimate_skew(binary, max_degrees=MAX_SKEW_DEGREES, step=SKEW_STEP_DEGREES):
+    """
+    Skew angle by projection profile: shear the ink pixels by each candidate
+    angle and keep the angle whose row histogram is most sharply peaked -
+    that is when text lines are horizontal. All angles are scored at once.
+    Returns:
+        float: Degrees to rotate the image counter-clockwise to straighten it
+    """
+    ys, xs = np.nonzero(binary == 0)
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > SKEW_SAMPLE_POINTS:
+        sample = np.linspace(0, len(ys) - 1, SKEW_SAMPLE_POINTS).astype(np.intp)
+        ys, xs = ys[sample], xs[sample]
+
+    angles = np.arange(-max_degrees, max_degrees + step / 2, step)
+    rows = np.rint(ys[None, :] + xs[None, :] * np.tan(np.radians(angles))[:, None]).astype(np.intp)
+    rows -= rows.min()
+    bins = rows.max() + 1
+
+    # One bincount for every angle: offset each angle's rows into its own range
+    flat = rows + (np.arange(len(angles)) * bins)[:, None]
+    profiles = np.bincount(flat.ravel(), minlength=len(angles) * bins).reshape(len(angles), bins)
+    scores = (profiles.astype(np.float64) ** 2).sum(axis=1)
+    # Shearing by +a levels lines that descend at a degrees; undo that tilt
+    return -float(angles[scores.argmax()])
@@ -0,0 +1,55 @@
+import os
+
+# Named OCR effort levels. Each profile sets:
+# - lang: 'auto' probes English/German per image, anything else is a fixed tesseract lang
+# - max_size: resize target for the OCR pass
+# - grayscale: OCR a single-channel copy (smaller to hand to the workers)
+# - preprocess: crop, binarize and deskew with NumPy first (see ocr_preprocess)
+# - lang_retry: rerun with the combined model when a single-language pass reads poorly
+# - region_fallback: search the bottom of German receipts when no date was found
+# - pdf_dpi, pdf_max_pages: rasterization of PDFs without a usable text layer
+# - time_budget: seconds a scan may take; then optional passes are skipped and
+#   running OCR is cancelled (capped by OCR_MAX_SCAN_SECONDS)
+PROFILES = {
+    # First guess of a progressive scan: tiny grayscale image, returns in a few hundred ms
+    'preview': {
+        'lang': 'eng', 'max_size': (640, 640), 'grayscale': True, 'preprocess': False,
+        'lang_retry': False, 'region_fallback': False,
+        'pdf_dpi': 100, 'pdf_max_pages': 1, 'time_budget': 2,
+    },
+    # Upload form prefill: one single-language pass on a small image
+    'fast': {
+        'lang': 'eng', 'max_size': (1000, 1000), 'grayscale': False, 'preprocess': True,
+        'lang_retry': False, 'region_fallback': False,
+        'pdf_dpi': 150, 'pdf_max_pages': 1, 'time_budget': 5,
+    },
+    'balanced': {
+        'lang': 'auto', 'max_size': (1800, 1800), 'grayscale': False, 'preprocess': True,
+        'lang_retry': True, 'region_fallback': True,
+        'pdf_dpi': 200, 'pdf_max_pages': 1, 'time_budget': 20,
+    },
+    # Reviewer re-scans: combined model at full resolution, every fallback
+    'accurate': {
+        'lang': 'eng+deu', 'max_size': (2400, 2400), 'grayscale': False, 'preprocess': True,
+        'lang_retry': False, 'region_fallback': True,
+        'pdf_dpi': 300, 'pdf_max_pages': 2, 'time_budget': 60,
+    },
+}
+
+DEFAULT_PROFILE = os.environ.get('OCR_DEFAULT_PROFILE', 'balanced')
+PREVIEW_PROFILE = 'preview'
+
+def get_profile(name=None):
+    """
+    Look up an OCR profile by name.
+    Args:
+        name (str): Profile name, DEFAULT_PROFILE when not given
+    Returns:
+        tuple: (name, settings dict)
+    Raises:
+        ValueError: If the profile does not exist
+    """
+    name = name or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown OCR profile: {name}")
+    return name, PROFILES[name]
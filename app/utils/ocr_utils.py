@@ -1,5 +1,10 @@
 import logging
 
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
 def setup_logger(name):
     """Set up and return a logger with the given name"""
     logger = logging.getLogger(name)
@@ -13,4 +18,11 @@ def setup_logger(name):
         console_handler.setFormatter(formatter)
         logger.addHandler(console_handler)
     
-    return logger 
\ No newline at end of file
+    return logger
+
+def get_peak_rss_mb():
+    """Peak resident memory of this process in MB, or None if unavailable."""
+    if resource is None:
+        return None
+    # ru_maxrss is reported in KB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from .ocr_utils import setup_logger
+
+# Set up logger
+logger = setup_logger(__name__)
+
+DEFAULT_LIMIT = 15  # Requests per period and client
+DEFAULT_PERIOD = 60  # Seconds
+MAX_MEMORY_KEYS = 10000  # Clients the memory backend remembers before evicting the oldest
+
+def sliding_window(state, now, limit, period, cost=1):
+    """
+    Sliding-window counter: the previous fixed window's count, weighted by
+    how much of it still overlaps the sliding window, plus the current count.
+    Constant time and constant space per client.
+
+    A request is admitted while the client is under the limit and then
+    counts cost hits, so a large batch may overdraw the budget and the
+    client waits until the window has slid past it.
+    Args:
+        state (tuple): (window_start, count, previous_count) or None for a new client
+        cost (int): Hits the request counts for
+    Returns:
+        tuple: (new_state, allowed, retry_after_seconds)
+    """
+    window_start = now - now % period
+    if state is None or state[0] < window_start - period:
+        count, previous = 0, 0  # Unseen, or idle for more than a window
+    elif state[0] < window_start:
+        count, previous = 0, state[1]  # Rolled into the next window
+    else:
+        count, previous = state[1], state[2]
+
+    overlap = 1 - (now - window_start) / period
+    if previous * overlap + count >= limit:
+        # The weighted count drops as the window slides, or resets once it has passed
+        retry_after = max(1, int(window_start + period - now) + 1)
+        return (window_start, count, previous), False, retry_after
+    return (window_start, count + cost, previous), True, 0
+
+class MemoryBackend:
+    """Per-process state; limits only hold per worker."""
+
+    def __init__(self, max_keys=MAX_MEMORY_KEYS):
+        self.max_keys = max_keys
+        self.states = OrderedDict()
+        self.lock = threading.Lock()
+
+    def update(self, key, func):
+        with self.lock:
+            state, result = func(self.states.get(key))
+            self.states[key] = state
+            self.states.move_to_end(key)
+            if len(self.states) > self.max_keys:
+                self.states.popitem(last=False)
+            return result
+
+class SQLiteBackend:
+    """
+    State in a SQLite file shared by every worker process on the host.
+    Each check is one indexed read and one write in an IMMEDIATE transaction,
+    so concurrent workers never lose an update.
+    """
+
+    def __init__(self, path, ttl=2 * DEFAULT_PERIOD, prune_every=1000):
+        self.path = path
+        self.ttl = ttl  # Rows older than this count as unseen clients
+        self.prune_every = prune_every
+        self.checks = 0
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("""CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY, window_start REAL, count INTEGER, previous INTEGER)""")
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_rate_limits_window ON rate_limits (window_start)')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    @property
+    def conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = self._connect()
+            conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def update(self, key, func):
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT window_start, count, previous FROM rate_limits WHERE key = ?',
+                               (key,)).fetchone()
+            state, result = func(row)
+            conn.execute('INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?, ?)', (key, *state))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._maybe_prune(conn, state[0])
+        return result
+
+    def _maybe_prune(self, conn, window_start):
+        """Drop stale clients with one indexed delete, once every prune_every checks."""
+        self.checks += 1
+        if self.checks % self.prune_every:
+            return
+        conn.execute('DELETE FROM rate_limits WHERE window_start < ?', (window_start - self.ttl,))
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter with a pluggable state backend.
+
+    The memory backend keeps state in the process. The SQLite backend shares
+    it between worker processes, so the limit holds for the whole server
+    rather than once per worker.
+    """
+
+    def __init__(self, limit=DEFAULT_LIMIT, period=DEFAULT_PERIOD, backend=None):
+        self.limit = limit
+        self.period = period
+        self.backend = backend or MemoryBackend()
+
+    def init_app(self, app):
+        """Read the limit and backend from the app config."""
+        self.limit = app.config.get('RATE_LIMIT', self.limit)
+        self.period = app.config.get('RATE_LIMIT_PERIOD', self.period)
+
+        testing = os.environ.get('FLASK_ENV') == 'testing' or app.config.get('TESTING', False)
+        if app.config.get('RATE_LIMIT_BACKEND') == 'sqlite' and not testing:
+            path = app.config.get('RATE_LIMIT_SQLITE_PATH') or os.path.join(
+                os.path.dirname(app.root_path), 'temp', 'rate_limits.sqlite')
+            self.backend = SQLiteBackend(path, ttl=2 * self.period)
+            logger.info(f"Rate limits shared through {path}")
+        else:
+            self.backend = MemoryBackend()
+
+    def hit(self, identifier, cost=1):
+        """
+        Count a request from identifier.
+        Args:
+            cost (int): Hits the request counts for, e.g. the files of a batch
+        Returns:
+            tuple: (allowed, retry_after_seconds)
+        """
+        now = time.time()
+        try:
+            return self.backend.update(identifier, lambda state: self._check(state, now, cost))
+        except sqlite3.Error as e:
+            # Never turn users away because the limiter store is unavailable
+            logger.error(f"Rate limiter backend failed: {str(e)}")
+            return True, 0
+
+    def _check(self, state, now, cost):
+        new_state, allowed, retry_after = sliding_window(state, now, self.limit, self.period, cost)
+        return new_state, (allowed, retry_after)
+
+    def is_rate_limited(self, identifier):
+        allowed, _ = self.hit(identifier)
+        return not allowed
+
+# Global rate limiter for the OCR endpoints
+rate_limiter = RateLimiter()
@@ -0,0 +1,257 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from ..extensions import db
+from ..models import Receipt
+from ..pdf_generator import ExpenseReportGenerator
+from .email import notify_reviewers_of_new_receipt
+from .ocr_utils import setup_logger
+
+# Set up logger
+logger = setup_logger(__name__)
+
+DEFAULT_MAX_WORKERS = 2  # Reports built at the same time
+DEFAULT_RENDER_PROCESSES = os.cpu_count() or 2  # Processes preparing receipt photos for all reports
+DEFAULT_STALE_MINUTES = 5  # A 'processing' receipt without progress for this long lost its build
+HEARTBEAT_SECONDS = 30  # Minimum time between report_updated_at refreshes while receipts are merged
+
+class ReportClaimLost(Exception):
+    """Raised when another build has claimed the receipt since this one was queued."""
+
+class ReportPipeline:
+    """
+    Builds expense report PDFs and notifies reviewers after submit_expense
+    has stored the submission.
+
+    The Receipt row is created with status 'processing'; its progress column
+    is advanced as the summary is built and the receipts are merged, and the
+    status becomes 'pending' (ready for review) or 'failed'. Without workers
+    (tests, scripts) reports are built in the calling thread.
+
+    Receipt photos are decoded and resampled on a shared process pool of
+    render_processes workers; with 0 they are prepared in the report thread.
+
+    The queue lives in memory, so the pipeline input is saved on the receipt
+    (report_data). report_updated_at is refreshed when a worker picks up the
+    build, at every progress step and while the receipts are merged. A build
+    lost to a restart shows up as a 'processing' receipt that has not moved
+    for stale_minutes; recover() requeues it. Failed builds can be started
+    again with retry().
+
+    Every queued build carries a claim token that is also stored on the
+    receipt (report_claim). Each write is conditional on the receipt still
+    being 'processing' with that token, so a build that was taken over by
+    recover() stops at its next step and can never overwrite the result of
+    a newer build or a reviewer's decision.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, render_processes=DEFAULT_RENDER_PROCESSES,
+                 stale_minutes=DEFAULT_STALE_MINUTES):
+        self.max_workers = max_workers
+        self.render_processes = render_processes
+        self.stale_minutes = stale_minutes
+        self.app = None
+        self.lock = threading.Lock()
+        self._executor = None
+        self._render_pool = None
+
+    def init_app(self, app):
+        """Read the worker and render process counts from the app config."""
+        self.app = app
+        self.max_workers = app.config.get('REPORT_WORKERS', self.max_workers)
+        self.render_processes = app.config.get('REPORT_RENDER_PROCESSES', self.render_processes)
+        self.stale_minutes = app.config.get('REPORT_STALE_MINUTES', self.stale_minutes)
+        if os.environ.get('FLASK_ENV') == 'testing' or app.config.get('TESTING', False):
+            self.max_workers = 0
+            self.render_processes = 0
+
+    @property
+    def executor(self):
+        with self.lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='report')
+            return self._executor
+
+    @property
+    def render_pool(self):
+        """Process pool for ExpenseReportGenerator.merge_with_receipts, None when disabled."""
+        if self.render_processes <= 0:
+            return None
+        with self.lock:
+            if self._render_pool is None:
+                self._render_pool = ProcessPoolExecutor(max_workers=self.render_processes,
+                                                        mp_context=multiprocessing.get_context('spawn'))
+            return self._render_pool
+
+    def _replace_render_pool(self, broken):
+        with self.lock:
+            if self._render_pool is broken:
+                self._render_pool = None
+        broken.shutdown(wait=False)
+
+    def submit(self, receipt_id, report, base_url):
+        """
+        Save the report input on a stored submission and queue its build.
+        Args:
+            receipt_id (int): Receipt row in status 'processing'
+            report (dict): user_name, expense_type, expenses, travel_details,
+                           comment and receipt_paths (uploads already on disk)
+            base_url (str): Root URL of the submitting request, for links in emails
+        """
+        claim = uuid.uuid4().hex
+        receipt = db.session.get(Receipt, receipt_id)
+        receipt.report_data = json.dumps(dict(report, base_url=base_url))
+        receipt.report_updated_at = datetime.now(timezone.utc)
+        receipt.report_claim = claim
+        db.session.commit()
+        self._queue(receipt_id, report, base_url, claim)
+
+    def retry(self, receipt_id):
+        """
+        Build the report of a 'failed' receipt again.
+        Returns:
+            bool: Whether the build was queued
+        """
+        return self._requeue(receipt_id, 'failed')
+
+    def recover(self, receipt_id=None):
+        """
+        Requeue builds lost by a restart: 'processing' receipts whose
+        report_updated_at is older than stale_minutes. Only one process
+        claims each receipt; one without saved report data is marked 'failed'.
+        Args:
+            receipt_id (int): Only check this receipt
+        Returns:
+            int: Number of builds requeued
+        """
+        query = Receipt.query.filter(Receipt.status == 'processing', self._stale())
+        if receipt_id is not None:
+            query = query.filter(Receipt.id == receipt_id)
+        stale_ids = [receipt.id for receipt in query.all()]
+        return sum(1 for stale_id in stale_ids if self._requeue(stale_id, 'processing'))
+
+    def _stale(self):
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=self.stale_minutes)
+        return db.or_(Receipt.report_updated_at.is_(None), Receipt.report_updated_at < cutoff)
+
+    def _requeue(self, receipt_id, status):
+        # Conditional UPDATE, so concurrent polls or processes claim a receipt only once
+        claim = uuid.uuid4().hex
+        query = Receipt.query.filter(Receipt.id == receipt_id, Receipt.status == status)
+        if status == 'processing':
+            query = query.filter(self._stale())
+        claimed = query.update({'status': 'processing', 'progress': 0, 'report_claim': claim,
+                                'report_updated_at': datetime.now(timezone.utc)},
+                               synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return False
+
+        receipt = db.session.get(Receipt, receipt_id)
+        db.session.refresh(receipt)
+        if not receipt.report_data:
+            logger.error(f"Receipt {receipt_id} has no saved report data, marking it failed")
+            self._write(receipt_id, claim, progress=100, status='failed')
+            return False
+
+        report = json.loads(receipt.report_data)
+        logger.info(f"Requeueing report for receipt {receipt_id} (was {status})")
+        self._queue(receipt_id, report, report.pop('base_url', None), claim)
+        return True
+
+    def _queue(self, receipt_id, report, base_url, claim):
+        if self.max_workers <= 0:
+            self.process(receipt_id, report, claim)
+        else:
+            self.executor.submit(self._process_in_context, receipt_id, report, base_url, claim)
+
+    def _process_in_context(self, receipt_id, report, base_url, claim):
+        # Email links are built with url_for, which needs a request context
+        with self.app.test_request_context(base_url=base_url):
+            try:
+                self.process(receipt_id, report, claim)
+            finally:
+                db.session.remove()
+
+    def _write(self, receipt_id, claim, **fields):
+        """
+        Store fields and a fresh report_updated_at if the build still owns the receipt.
+        Raises:
+            ReportClaimLost: If the receipt left 'processing' or was claimed by another build
+        """
+        fields['report_updated_at'] = datetime.now(timezone.utc)
+        updated = Receipt.query.filter(
+            Receipt.id == receipt_id, Receipt.status == 'processing', Receipt.report_claim == claim
+        ).update(fields, synchronize_session=False)
+        db.session.commit()
+        if not updated:
+            raise ReportClaimLost(f"Receipt {receipt_id} is no longer owned by this build")
+
+    def process(self, receipt_id, report, claim):
+        """Build the report, then notify reviewers; a failed build marks the receipt 'failed'."""
+        try:
+            self._write(receipt_id, claim)  # Picked up by a worker
+            self.build(receipt_id, report, claim)
+        except ReportClaimLost as e:
+            logger.warning(f"Dropping report build: {str(e)}")
+            return
+        except Exception as e:
+            logger.error(f"Report for receipt {receipt_id} failed: {str(e)}", exc_info=True)
+            db.session.rollback()
+            try:
+                self._write(receipt_id, claim, progress=100, status='failed')
+            except ReportClaimLost:
+                pass
+            return
+
+        try:
+            notify_reviewers_of_new_receipt(db.session.get(Receipt, receipt_id))
+        except Exception as e:
+            logger.error(f"Failed to notify reviewers about receipt {receipt_id}: {str(e)}")
+
+    def build(self, receipt_id, report, claim):
+        """Build the summary PDF, merge the receipts and mark the receipt ready for review."""
+        self._write(receipt_id, claim, progress=10)
+        generator = ExpenseReportGenerator(report['user_name'], report['expense_type'])
+        summary_pdf_path, report_id = generator.generate_report(
+            expenses=report['expenses'],
+            travel_details=report['travel_details'],
+            comment=report['comment']
+        )
+
+        self._write(receipt_id, claim, progress=40)
+        last_beat = time.monotonic()
+
+        def heartbeat():
+            # Keep a long merge from looking stale; the final write checks the claim
+            nonlocal last_beat
+            if time.monotonic() - last_beat < HEARTBEAT_SECONDS:
+                return
+            last_beat = time.monotonic()
+            try:
+                self._write(receipt_id, claim)
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"Report heartbeat for receipt {receipt_id} failed: {str(e)}")
+
+        stats = {}
+        render_pool = self.render_pool
+        final_pdf_path = ExpenseReportGenerator.merge_with_receipts(summary_pdf_path, report['receipt_paths'],
+                                                                    stats=stats, executor=render_pool,
+                                                                    on_page=heartbeat)
+        if stats.get('render_pool_broken'):
+            self._replace_render_pool(render_pool)
+
+        self._write(receipt_id, claim, file_path_db=final_pdf_path, progress=100, status='pending',
+                    report_data=None, report_claim=None)
+        logger.info(f"Report {report_id} ready for receipt {receipt_id}, "
+                    f"{stats.get('bytes_saved', 0)} bytes saved by recompressing images")
+
+# Global pipeline for submitted expense reports
+report_pipeline = ReportPipeline()
@@ -18,6 +18,36 @@ class Config:
     - MAIL_USERNAME: Email username (required for sending emails)
     - MAIL_PASSWORD: Email password (required for sending emails)
     - ALLOWED_EMAIL_DOMAINS: Comma-separated list of allowed email domains
+    - OCR_JOB_WORKERS: Background OCR threads for async scans (default: 2)
+    - OCR_JOB_MAX_PENDING: Queued + running OCR jobs before new ones are refused (default: 20)
+    - OCR_JOB_BACKEND: 'sqlite' shares OCR job status between worker processes, 'memory' keeps it per process (default: sqlite)
+    - OCR_JOB_SQLITE_PATH: SQLite file for the shared OCR jobs (default: temp/ocr_jobs.sqlite)
+    - REPORT_WORKERS: Background threads building submitted expense reports (default: 2)
+    - REPORT_STALE_MINUTES: A processing report without progress for this long is built again (default: 5)
+    - REPORT_RENDER_PROCESSES: Processes preparing receipt photos for reports, 0 prepares them in the report thread (default: CPU count)
+    - REPORT_IMAGE_DPI: Resolution receipt photos are resampled to for their A4 page (default: 150, read by the PDF generator)
+    - REPORT_IMAGE_QUALITY: JPEG quality of embedded receipt photos (default: 80, read by the PDF generator)
+    - OCR_ASYNC_THRESHOLD_MB: Uploads larger than this are scanned in the background (default: 1.0)
+    - OCR_CACHE_ENABLED: Reuse OCR results for identical uploads (default: True)
+    - OCR_CACHE_MAX_ENTRIES: In-memory OCR cache size per process (default: 256)
+    - OCR_CACHE_DIR: Shared on-disk OCR cache directory (default: temp/ocr_cache)
+    - OCR_BATCH_WORKERS: Receipts of a batch scanned at the same time (default: CPU count)
+    - OCR_BATCH_MAX_FILES: Maximum files per batch OCR request (default: 30)
+    - OCR_POOL_SIZE: OCR worker processes, started on the first scan; 0 runs OCR in the web process (default: CPU count)
+    - OCR_POOL_MAX_JOBS: Jobs before an OCR worker is replaced (default: 200)
+    - OCR_POOL_MAX_MEMORY_MB: OCR worker memory that triggers a recycle (default: 512)
+    - OCR_MAX_CONCURRENT: OCR runs at once across all requests (default: CPU count)
+    - OCR_MAX_WAITING: Requests that may queue for an OCR slot before getting 503 (default: 8)
+    - OCR_ADMISSION_TIMEOUT: Seconds a request waits for an OCR slot (default: 10)
+    - RATE_LIMIT: OCR requests per client and period, every file of a batch counts (default: 15)
+    - RATE_LIMIT_PERIOD: Rate limit window in seconds (default: 60)
+    - RATE_LIMIT_BACKEND: "sqlite" shares limits between worker processes, "memory" keeps them per process (default: sqlite)
+    - RATE_LIMIT_SQLITE_PATH: SQLite file holding shared rate limit state (default: temp/rate_limits.sqlite)
+    - OCR_RAW_TEXT_SAMPLE_RATE: Fraction of scans whose raw OCR text is logged at DEBUG (default: 0, read by the OCR processor)
+    - OCR_LANG_MODE: "auto" probes each image for English or German, or a fixed tesseract lang such as eng+deu, for profiles that auto-detect (default: auto, read by the OCR processor)
+    - OCR_MAX_SCAN_SECONDS: Hard cap on one scan; OCR still running then is cancelled and a partial result is returned (default: 60, read by the OCR processor)
+    - OCR_PREPROCESS: Set to 1 to run the NumPy crop/threshold/deskew stage before tesseract (default: 0, read by the OCR processor)
+    - OCR_DEFAULT_PROFILE: OCR profile for requests that don't pick one: preview, fast, balanced or accurate (default: balanced, read by the OCR profiles)
     """
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
@@ -42,6 +72,42 @@ class Config:
     # Add this to your Config class
     ALLOWED_EMAIL_DOMAINS = os.environ.get('ALLOWED_EMAIL_DOMAINS', '').split(',') if os.environ.get('ALLOWED_EMAIL_DOMAINS') else []
     
+    # Expense report pipeline
+    REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 2))
+    REPORT_STALE_MINUTES = int(os.environ.get('REPORT_STALE_MINUTES', 5))
+    REPORT_RENDER_PROCESSES = int(os.environ.get('REPORT_RENDER_PROCESSES', os.cpu_count() or 2))
+    
+    # OCR background jobs
+    OCR_JOB_WORKERS = int(os.environ.get('OCR_JOB_WORKERS', 2))
+    OCR_JOB_MAX_PENDING = int(os.environ.get('OCR_JOB_MAX_PENDING', 20))
+    OCR_JOB_RESULT_TTL = 600  # Seconds a finished job stays pollable
+    OCR_JOB_BACKEND = os.environ.get('OCR_JOB_BACKEND', 'sqlite')
+    OCR_JOB_SQLITE_PATH = os.environ.get('OCR_JOB_SQLITE_PATH')
+    OCR_ASYNC_THRESHOLD_MB = float(os.environ.get('OCR_ASYNC_THRESHOLD_MB', 1.0))
+    OCR_BATCH_WORKERS = int(os.environ.get('OCR_BATCH_WORKERS', os.cpu_count() or 2))
+    OCR_BATCH_MAX_FILES = int(os.environ.get('OCR_BATCH_MAX_FILES', 30))
+    
+    # OCR result cache
+    OCR_CACHE_ENABLED = os.environ.get('OCR_CACHE_ENABLED', 'True').lower() in ('true', 'yes', '1')
+    OCR_CACHE_MAX_ENTRIES = int(os.environ.get('OCR_CACHE_MAX_ENTRIES', 256))
+    OCR_CACHE_DIR = os.environ.get('OCR_CACHE_DIR')
+    
+    # OCR worker pool
+    OCR_POOL_SIZE = int(os.environ.get('OCR_POOL_SIZE', os.cpu_count() or 2))
+    OCR_POOL_MAX_JOBS = int(os.environ.get('OCR_POOL_MAX_JOBS', 200))
+    OCR_POOL_MAX_MEMORY_MB = int(os.environ.get('OCR_POOL_MAX_MEMORY_MB', 512))
+    
+    # OCR admission control
+    OCR_MAX_CONCURRENT = int(os.environ.get('OCR_MAX_CONCURRENT', os.cpu_count() or 2))
+    OCR_MAX_WAITING = int(os.environ.get('OCR_MAX_WAITING', 8))
+    OCR_ADMISSION_TIMEOUT = float(os.environ.get('OCR_ADMISSION_TIMEOUT', 10))
+    
+    # OCR rate limiting
+    RATE_LIMIT = int(os.environ.get('RATE_LIMIT', 15))
+    RATE_LIMIT_PERIOD = int(os.environ.get('RATE_LIMIT_PERIOD', 60))
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'sqlite')
+    RATE_LIMIT_SQLITE_PATH = os.environ.get('RATE_LIMIT_SQLITE_PATH')
+    
     @staticmethod
     def get_current_time():
         return datetime.utcnow() + timedelta(hours=1)  # German time is UTC+1
@@ -1,9 +1,10 @@
 from app import create_app, db
 from config import Config
 
-app = create_app()
-
 if __name__ == '__main__':
+    # Build the app only when run as a script: OCR and report worker processes
+    # are spawned and re-import this module as __mp_main__
+    app = create_app()
     with app.app_context():
         db.create_all()
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+"""
+OCR accuracy and latency benchmark.
+
+Runs ReceiptScanner.scan_receipt over a corpus of sample receipts and
+compares the extracted fields with expected values stored next to each
+file as a JSON sidecar:
+
+    corpus/
+        rewe_2024_03.jpg
+        rewe_2024_03.json   {"total": 12.5, "date": "2024-03-12", "currency": "EUR"}
+        lufthansa.pdf
+        lufthansa.json      {"total": 245.5, "date": "2024-02-01", "currency": "EUR"}
+
+Reports per-field accuracy and p50/p95/max latency per stage, and exits
+non-zero when results regress against a stored baseline. Runs offline
+against the local tesseract install; the OCR cache is disabled.
+
+With --compare-lang the corpus is scanned once with the combined
+eng+deu model and once with language detection, and the latency saved
+per receipt is printed next to the accuracy of both runs.
+
+With --compare-preprocess the corpus is scanned with and without the
+NumPy preprocessing stage, and tesseract time, fallback counts and
+accuracy of both runs are printed side by side.
+
+Usage:
+    python scripts/ocr_benchmark.py CORPUS_DIR [--baseline FILE] [--update-baseline]
+    python scripts/ocr_benchmark.py CORPUS_DIR --compare-lang
+    python scripts/ocr_benchmark.py CORPUS_DIR --profile fast
+    python scripts/ocr_benchmark.py CORPUS_DIR --compare-preprocess
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ocr import ReceiptScanner
+from app.utils import ocr_processor
+from app.utils.ocr_cache import ocr_cache
+from app.utils.ocr_profiles import PROFILES
+
+RECEIPT_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.pdf')
+FIELDS = ('total', 'date', 'currency')
+LATENCY_SLACK_SECONDS = 0.01  # Absolute slack so millisecond stages don't flap
+FALLBACK_COUNTERS = ('tesseract_calls', 'lang.probe_unsure', 'lang.retry', 'fallback.bottom_region_date', 'budget.timeout')
+
+def load_corpus(corpus_dir):
+    """Return (receipt_path, expected) pairs for every receipt with a sidecar."""
+    cases = []
+    for filename in sorted(os.listdir(corpus_dir)):
+        if not filename.lower().endswith(RECEIPT_EXTENSIONS):
+            continue
+        receipt_path = os.path.join(corpus_dir, filename)
+        sidecar_path = os.path.splitext(receipt_path)[0] + '.json'
+        if not os.path.exists(sidecar_path):
+            print(f"Skipping {filename}: no expected values in {os.path.basename(sidecar_path)}")
+            continue
+        with open(sidecar_path) as f:
+            cases.append((receipt_path, json.load(f)))
+    return cases
+
+def field_matches(field, expected, actual):
+    if field == 'total':
+        return expected is not None and actual is not None and abs(float(expected) - float(actual)) < 0.01
+    return expected == actual
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def run_benchmark(cases, repeat=1, profile=None):
+    """Scan every case with an OCR profile and collect field hits and stage latencies."""
+    scanner = ReceiptScanner()
+    hits = {field: 0 for field in FIELDS}
+    latencies = {}  # stage -> list of seconds
+    receipts = {}  # filename -> p50 total seconds
+    counters = Counter()  # Pipeline counters summed over all scans
+    failures = []
+
+    for receipt_path, expected in cases:
+        totals = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = scanner.scan_receipt(receipt_path, profile=profile)
+            totals.append(time.perf_counter() - start)
+            for stage, seconds in result.get('timings', {}).items():
+                latencies.setdefault(stage, []).append(seconds)
+            counters.update(result.get('counters', {}))
+        latencies.setdefault('total', []).extend(totals)
+        receipts[os.path.basename(receipt_path)] = percentile(totals, 50)
+
+        for field in FIELDS:
+            if field not in expected:
+                continue
+            if field_matches(field, expected[field], result.get(field)):
+                hits[field] += 1
+            else:
+                failures.append((os.path.basename(receipt_path), field, expected[field], result.get(field)))
+
+    counted = {field: sum(1 for _, expected in cases if field in expected) for field in FIELDS}
+    accuracy = {field: hits[field] / counted[field] for field in FIELDS if counted[field]}
+    latency = {stage: {'p50': percentile(values, 50), 'p95': percentile(values, 95), 'max': max(values)}
+               for stage, values in latencies.items()}
+    return {'cases': len(cases), 'accuracy': accuracy, 'latency': latency, 'receipts': receipts,
+            'counters': dict(counters)}, failures
+
+def compare_to_baseline(report, baseline, accuracy_tolerance, latency_tolerance):
+    """Return a list of human-readable regressions."""
+    regressions = []
+    for field, value in baseline.get('accuracy', {}).items():
+        current = report['accuracy'].get(field)
+        if current is not None and current < value - accuracy_tolerance:
+            regressions.append(f"{field} accuracy {current:.1%} < baseline {value:.1%}")
+    for stage, stats in baseline.get('latency', {}).items():
+        current = report['latency'].get(stage)
+        if current and current['p95'] > stats['p95'] * (1 + latency_tolerance) + LATENCY_SLACK_SECONDS:
+            regressions.append(f"{stage} p95 {current['p95']:.3f}s > baseline {stats['p95']:.3f}s")
+    return regressions
+
+def print_report(report, failures):
+    print(f"\nReceipts: {report['cases']}")
+    print("\nAccuracy:")
+    for field, value in report['accuracy'].items():
+        print(f"  {field:<10} {value:7.1%}")
+    print("\nLatency (seconds):")
+    print(f"  {'stage':<24} {'p50':>8} {'p95':>8} {'max':>8}")
+    for stage, stats in sorted(report['latency'].items()):
+        print(f"  {stage:<24} {stats['p50']:8.3f} {stats['p95']:8.3f} {stats['max']:8.3f}")
+    if failures:
+        print("\nMismatches:")
+        for filename, field, expected, actual in failures:
+            print(f"  {filename}: {field} expected {expected!r}, got {actual!r}")
+
+def print_lang_comparison(combined, detected):
+    """Per-receipt latency saved by language detection, and accuracy of both runs."""
+    print(f"\nLanguage detection vs {ocr_processor.OCR_LANG} (p50 seconds):")
+    print(f"  {'receipt':<32} {'combined':>9} {'detected':>9} {'saved':>8}")
+    for filename, seconds in combined['receipts'].items():
+        detected_seconds = detected['receipts'][filename]
+        print(f"  {filename:<32} {seconds:9.3f} {detected_seconds:9.3f} {seconds - detected_seconds:8.3f}")
+    saved = sum(combined['receipts'].values()) - sum(detected['receipts'].values())
+    print(f"  {'average saved per receipt':<52} {saved / combined['cases']:8.3f}")
+    print("\nAccuracy (combined -> detected):")
+    for field, value in combined['accuracy'].items():
+        print(f"  {field:<10} {value:7.1%} -> {detected['accuracy'].get(field, 0):7.1%}")
+
+def print_preprocess_comparison(plain, cleaned):
+    """Tesseract time, fallback counts and accuracy without and with preprocessing."""
+    print("\nPreprocessing off -> on:")
+    for stage in ('tesseract', 'preprocess', 'total'):
+        before = plain['latency'].get(stage, {}).get('p50', 0)
+        after = cleaned['latency'].get(stage, {}).get('p50', 0)
+        print(f"  {stage + ' p50 (s)':<32} {before:8.3f} -> {after:8.3f}")
+    for name in FALLBACK_COUNTERS:
+        before = plain['counters'].get(name, 0) / plain['cases']
+        after = cleaned['counters'].get(name, 0) / cleaned['cases']
+        print(f"  {name + ' per receipt':<32} {before:8.2f} -> {after:8.2f}")
+    for field, value in plain['accuracy'].items():
+        print(f"  {field + ' accuracy':<32} {value:8.1%} -> {cleaned['accuracy'].get(field, 0):8.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR accuracy and latency benchmark")
+    parser.add_argument('corpus', help="Directory of receipts with .json sidecars")
+    parser.add_argument('--baseline', help="Baseline JSON to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--repeat', type=int, default=1, help="Scans per receipt for latency figures")
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.0, help="Allowed accuracy drop (0.02 = 2 points)")
+    parser.add_argument('--latency-tolerance', type=float, default=0.25, help="Allowed p95 slowdown (0.25 = 25%%)")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    parser.add_argument('--lang-mode', help="OCR language mode: 'auto' or a fixed tesseract lang such as eng+deu")
+    parser.add_argument('--compare-preprocess', action='store_true',
+                        help="Compare scans with and without NumPy preprocessing; exits 1 if accuracy drops")
+    parser.add_argument('--profile', choices=PROFILES, help="OCR profile, the default profile if not given")
+    parser.add_argument('--compare-lang', action='store_true',
+                        help="Compare language detection with the combined model; exits 1 if accuracy drops")
+    args = parser.parse_args()
+
+    # Keep OCR logging quiet and never serve results from the cache
+    logging.disable(logging.INFO)
+    ocr_cache.enabled = False
+
+    cases = load_corpus(args.corpus)
+    if not cases:
+        print(f"No receipts with sidecars found in {args.corpus}")
+        return 2
+
+    if args.compare_lang:
+        ocr_processor.OCR_LANG_MODE = ocr_processor.OCR_LANG
+        combined, _ = run_benchmark(cases, repeat=args.repeat, profile=args.profile)
+        ocr_processor.OCR_LANG_MODE = 'auto'
+        detected, _ = run_benchmark(cases, repeat=args.repeat, profile=args.profile)
+        print_lang_comparison(combined, detected)
+        regressions = compare_to_baseline(detected, {'accuracy': combined['accuracy']}, args.accuracy_tolerance, 0)
+        for regression in regressions:
+            print(f"  REGRESSION: {regression}")
+        return 1 if regressions else 0
+
+    if args.compare_preprocess:
+        ocr_processor.OCR_PREPROCESS = False
+        plain, _ = run_benchmark(cases, repeat=args.repeat, profile=args.profile)
+        ocr_processor.OCR_PREPROCESS = True
+        cleaned, _ = run_benchmark(cases, repeat=args.repeat, profile=args.profile)
+        print_preprocess_comparison(plain, cleaned)
+        regressions = compare_to_baseline(cleaned, {'accuracy': plain['accuracy']}, args.accuracy_tolerance, 0)
+        for regression in regressions:
+            print(f"  REGRESSION: {regression}")
+        return 1 if regressions else 0
+
+    if args.lang_mode:
+        ocr_processor.OCR_LANG_MODE = args.lang_mode
+
+    report, failures = run_benchmark(cases, repeat=args.repeat, profile=args.profile)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, failures)
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.accuracy_tolerance, args.latency_tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions against baseline")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
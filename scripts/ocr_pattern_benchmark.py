@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+Regex overhead micro-benchmark for the OCR extractors.
+
+Compares the old per-call pattern cascades (string patterns handed to
+re.search one after another, or patterns built inside the function) with
+the precompiled combined patterns in app/utils/ocr_patterns.py. The old
+code is reproduced here so the comparison keeps working after it is gone.
+
+"amount+date" runs the old currency, amount and date extractors, which
+stop at the first cascade step that finds something, against tokenize,
+which collects every money, date, currency and keyword token of the text
+in one scan for scoring.
+
+"cold" runs clear Python's regex cache before every call, which is what
+happens once more distinct patterns are in use than re caches.
+
+Usage:
+    python scripts/ocr_pattern_benchmark.py [--number 20000]
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.ocr_extractors import extract_currency
+from app.utils.ocr_processor import find_date_in_region_text
+from app.utils.ocr_candidates import tokenize, format_date
+from app.utils.ocr_utils import setup_logger
+
+logger = setup_logger(__name__)
+
+SAMPLE_TEXT = """REWE Markt GmbH
+Hauptstr. 12, 10115 Berlin
+Banane 1,29
+Milch 0,99
+Brot 2,49
+SUMME EUR 4,77
+Geg. EC-Karte 4,77
+Datum: 10.10.2024 14:17
+BEGINN 10.10.24 ENDE
+Vielen Dank für Ihren Einkauf
+""".lower()
+
+def legacy_currency(text_lower):
+    currency_patterns = {
+        'EUR': [r'€', r'\beur\b', r'\beuro', r'\d\s*€', r'eur\s*\d'],
+        'USD': [r'(?:us)?[\$]', r'\busd\b', r'\bdollar', r'\$\s*\d'],
+    }
+    for curr, patterns in currency_patterns.items():
+        if any(re.search(pattern, text_lower, re.IGNORECASE) for pattern in patterns):
+            logger.info(f"Currency detected: {curr}")
+            return curr
+    return None
+
+def legacy_region_date(region_text):
+    match = re.search(r'BEGINN\s+(\d{1,2})[/.-](\d{1,2})[/.-](\d{2,4})', region_text, re.IGNORECASE)
+    if match and format_date(*match.groups()):
+        return format_date(*match.groups())
+    match = re.search(r'(\d{1,2})[/.-](\d{1,2})[/.-](\d{2,4})', region_text)
+    if match and format_date(*match.groups()):
+        return format_date(*match.groups())
+    return re.search(r'[^\d](\d{2})[/.-](\d{4})\s+\d{1,2}:\d{1,2}', region_text)
+
+LEGACY_MONTHS = {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+                 'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12}
+
+def legacy_amount(text_lower, lines, currency, original_text):
+    """The old extract_amount: German keywords, largest € amount, currency symbol, keyword lines, last lines."""
+    for pattern in [r'gesamtbrutto\s+[€]?(\d+[.,]\d+)', r'ec-zahlung\s+[€]?(\d+[.,]\d+)',
+                    r'zw-summe\s+[€]?(\d+[.,]\d+)', r'gesamt\s+[€]?(\d+[.,]\d+)']:
+        matches = re.findall(pattern, text_lower)
+        if matches:
+            return float(matches[0].replace(',', '.'))
+    if '€' in original_text:
+        amounts = re.findall(r'€\s*(\d+[.,]\d+)', original_text.replace(' ', ''))
+        if amounts:
+            return max(float(amount.replace(',', '.')) for amount in amounts)
+    symbol = {'USD': '$', 'EUR': '€'}.get(currency, '')
+    if symbol:
+        matches = re.findall(rf'{symbol}\s*(\d+[.,]\d+)', text_lower)
+        if matches:
+            return float(matches[-1].replace(',', '.'))
+    for line in lines:
+        line_lower = line.lower()
+        for keyword in ['total', 'sum', 'amount', 'due', 'pay', 'balance', 'summe', 'betrag']:
+            if keyword in line_lower:
+                numbers = re.findall(r'(\d+[.,]\d+)', line_lower)
+                if numbers:
+                    return float(numbers[-1].replace(',', '.'))
+    numbers = [float(number.replace(',', '.')) for line in lines[-10:]
+               for number in re.findall(r'(\d+[.,]\d+)', line.lower())]
+    return max(numbers) if numbers else None
+
+def legacy_date(text_lower):
+    """The old extract_date: BEGINN/ENDE patterns, then the general date patterns, then date keyword lines."""
+    for pattern in [r'beginn\s+(\d{1,2})/(\d{1,2})/(\d{2,4})', r'ende\s+(\d{1,2})/(\d{1,2})/(\d{2,4})',
+                    r'beginn\s+(\d{1,2})\.(\d{1,2})\.(\d{2,4})', r'ende\s+(\d{1,2})\.(\d{1,2})\.(\d{2,4})']:
+        matches = re.findall(pattern, text_lower)
+        if matches and format_date(*matches[0]):
+            return format_date(*matches[0])
+    date_patterns = [
+        r'(\d{1,2})[/.-](\d{1,2})[/.-](\d{2,4})',
+        r'(\d{4})[/.-](\d{1,2})[/.-](\d{1,2})',
+        r'(\d{1,2})\s?(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s?(\d{2,4})',
+        r'(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s?(\d{1,2})[\s,]+(\d{2,4})',
+    ]
+    for pattern in date_patterns:
+        matches = re.findall(pattern, text_lower)
+        if matches:
+            first = matches[0]
+            if len(first[0]) == 4:
+                year, month, day = first
+            elif first[1] in LEGACY_MONTHS:
+                day, month, year = first[0], LEGACY_MONTHS[first[1]], first[2]
+            elif first[0] in LEGACY_MONTHS:
+                month, day, year = LEGACY_MONTHS[first[0]], first[1], first[2]
+            else:
+                day, month, year = first
+            if format_date(day, month, year):
+                return format_date(day, month, year)
+    for line in text_lower.split('\n'):
+        if 'date' in line or 'datum' in line:
+            for pattern in date_patterns[:2]:
+                matches = re.findall(pattern, line)
+                if matches and format_date(*matches[0]):
+                    return format_date(*matches[0])
+    return None
+
+def legacy_amount_and_date(text_lower):
+    currency = legacy_currency(text_lower)
+    return legacy_amount(text_lower, text_lower.split('\n'), currency, text_lower), legacy_date(text_lower)
+
+CASES = [
+    ('currency', lambda: legacy_currency(SAMPLE_TEXT), lambda: extract_currency(SAMPLE_TEXT)),
+    ('region date', lambda: legacy_region_date(SAMPLE_TEXT), lambda: find_date_in_region_text(SAMPLE_TEXT, SAMPLE_TEXT)),
+    ('amount+date', lambda: legacy_amount_and_date(SAMPLE_TEXT), lambda: tokenize(SAMPLE_TEXT)),
+]
+
+def per_call_us(func, number, cold=False):
+    if cold:
+        def call():
+            re.purge()
+            func()
+    else:
+        call = func
+    # Best of a few runs, the minimum is the least noisy estimate
+    return min(timeit.repeat(call, number=number, repeat=5)) / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR regex overhead micro-benchmark")
+    parser.add_argument('--number', type=int, default=20000, help="Calls per measurement")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    print(f"{'case':<14} {'legacy warm':>12} {'legacy cold':>12} {'registry':>10}   (microseconds per call)")
+    for name, legacy, current in CASES:
+        warm = per_call_us(legacy, args.number)
+        cold = per_call_us(legacy, max(1, args.number // 10), cold=True)
+        registry = per_call_us(current, args.number)
+        print(f"{name:<14} {warm:12.2f} {cold:12.2f} {registry:10.2f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
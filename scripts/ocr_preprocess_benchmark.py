@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Speed and skew-recovery benchmark for the NumPy preprocessing stage.
+
+Renders synthetic receipts - text on paper with a lighting gradient and
+noise, tilted by a known angle and placed on a dark table - and reports
+per stage milliseconds for app/utils/ocr_preprocess.py at the OCR sizes of
+the profiles, plus the error of the recovered skew angle. A per-pixel
+Python adaptive threshold is timed on a small image for comparison with
+the vectorized one.
+
+Whether preprocessing helps tesseract is measured on real receipts with
+ocr_benchmark.py --compare-preprocess.
+
+Usage:
+    python scripts/ocr_preprocess_benchmark.py [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from app.utils import ocr_preprocess
+from app.utils.ocr_profiles import PROFILES
+
+SKEW_ANGLES = (-4.0, -1.5, 0.0, 2.0, 5.0)
+
+def synthetic_receipt(size, angle, seed=0):
+    """A receipt photo of the given size tilted by angle degrees."""
+    rng = random.Random(seed)
+    width, height = int(size[0] * 0.6), int(size[1] * 0.85)
+    paper = Image.new('L', (width, height), 235)
+    draw = ImageDraw.Draw(paper)
+    line_height = max(12, height // 45)
+    for i, y in enumerate(range(line_height * 2, height - line_height * 2, line_height)):
+        draw.text((width // 12, y), f"Artikel {i:02d}   {rng.randint(1, 99)},{rng.randint(0, 99):02d} EUR", fill=30)
+
+    # Lighting falls off towards the bottom, as with a phone held at an angle
+    shade = Image.linear_gradient('L').resize((width, height)).point(lambda v: 255 - v // 3)
+    paper = Image.composite(paper, Image.new('L', (width, height), 0), shade)
+    paper = paper.rotate(-angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=50)
+
+    photo = Image.new('L', size, 50)
+    photo.paste(paper, ((size[0] - paper.width) // 2, (size[1] - paper.height) // 2))
+    noise = Image.effect_noise(size, 12)
+    return Image.blend(photo, noise, 0.1)
+
+def python_threshold(gray, block=15, offset=ocr_preprocess.THRESHOLD_OFFSET):
+    """Per-pixel adaptive threshold, the way it would be written without NumPy."""
+    width, height = gray.size
+    pixels = gray.load()
+    radius = block // 2
+    out = Image.new('L', gray.size, 255)
+    out_pixels = out.load()
+    for y in range(height):
+        for x in range(width):
+            total = count = 0
+            for yy in range(max(0, y - radius), min(height, y + radius + 1)):
+                for xx in range(max(0, x - radius), min(width, x + radius + 1)):
+                    total += pixels[xx, yy]
+                    count += 1
+            if pixels[x, y] < total / count - offset:
+                out_pixels[x, y] = 0
+    return out
+
+def per_call_ms(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy preprocessing benchmark")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement, the best is reported")
+    args = parser.parse_args()
+
+    if not ocr_preprocess.available():
+        print("NumPy is not installed, the preprocessing stage is disabled")
+        return 2
+    np = ocr_preprocess.np
+
+    sizes = sorted({PROFILES[name]['max_size'] for name in PROFILES if PROFILES[name]['preprocess']})
+    print(f"{'size':<12} {'crop':>7} {'threshold':>10} {'deskew':>8} {'total':>8}   (milliseconds)")
+    for size in sizes:
+        image = synthetic_receipt((size[0] * 2 // 3, size[1]), angle=2.0)
+        gray = np.asarray(image, dtype=np.uint8)
+        binary = ocr_preprocess.adaptive_threshold(gray)
+        crop = per_call_ms(lambda: ocr_preprocess.find_paper_box(gray), args.repeat)
+        threshold = per_call_ms(lambda: ocr_preprocess.adaptive_threshold(gray), args.repeat)
+        deskew = per_call_ms(lambda: ocr_preprocess.estimate_skew(binary), args.repeat)
+        total = per_call_ms(lambda: ocr_preprocess.preprocess_image(image), args.repeat)
+        print(f"{f'{image.width}x{image.height}':<12} {crop:7.1f} {threshold:10.1f} {deskew:8.1f} {total:8.1f}")
+
+    print("\nSkew recovery (degrees):")
+    for angle in SKEW_ANGLES:
+        _, info = ocr_preprocess.preprocess_image(synthetic_receipt((1200, 1800), angle))
+        print(f"  tilted {angle:5.1f} -> corrected by {info['angle']:5.2f} (error {abs(info['angle'] - angle):.2f})")
+
+    small = synthetic_receipt((160, 240), angle=0.0)
+    small_gray = np.asarray(small, dtype=np.uint8)
+    python_ms = per_call_ms(lambda: python_threshold(small), 1)
+    numpy_ms = per_call_ms(lambda: ocr_preprocess.adaptive_threshold(small_gray, block=15), args.repeat)
+    print(f"\nAdaptive threshold on 160x240: per-pixel Python {python_ms:.1f}ms, NumPy {numpy_ms:.2f}ms "
+          f"({python_ms / numpy_ms:.0f}x)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Wall-clock benchmark for assembling expense report PDFs on a process pool.
+
+Writes synthetic 12 MP phone photos, then times
+ExpenseReportGenerator.merge_with_receipts for each receipt count with the
+photos prepared in process (pool size 0) and on process pools of the given
+sizes, the way the report pipeline runs it (REPORT_RENDER_PROCESSES). Pools
+are started and warmed before timing.
+
+Usage:
+    python scripts/report_render_benchmark.py [--counts 1,4,16,32] [--pools 0,2,4] [--repeat 3]
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from app.pdf_generator import ExpenseReportGenerator, prepare_receipt_image
+
+PHOTO_SIZE = (3000, 4000)
+
+def synthetic_photo(path, number):
+    """A receipt photo: printed lines on lit paper with sensor noise, unique per number."""
+    width, height = PHOTO_SIZE
+    photo = Image.linear_gradient('L').resize(PHOTO_SIZE).point(lambda v: 200 + v // 5).convert('RGB')
+    draw = ImageDraw.Draw(photo)
+    for y in range(200, height - 200, 60):
+        draw.text((300, y), f"Receipt {number:03d}  Artikel {y // 60:03d}  {y % 97},{y % 89:02d} EUR", fill=(30, 30, 30))
+    noise = Image.effect_noise((width // 4, height // 4), 20).resize(PHOTO_SIZE).convert('RGB')
+    Image.blend(photo, noise, 0.08).save(path, quality=92)
+
+def summary_pdf(directory):
+    with contextlib.redirect_stdout(io.StringIO()):
+        path, _ = ExpenseReportGenerator('Benchmark User').generate_report(expenses=[])
+    target = os.path.join(directory, 'summary.pdf')
+    shutil.move(path, target)
+    return target
+
+def time_merge(directory, summary, photos, executor, repeat):
+    best = None
+    for run in range(repeat):
+        run_summary = os.path.join(directory, f'run{run}_summary.pdf')
+        shutil.copy(summary, run_summary)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            final_path = ExpenseReportGenerator.merge_with_receipts(run_summary, photos, executor=executor)
+        elapsed = time.perf_counter() - started
+        os.remove(final_path)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Report render pool benchmark")
+    parser.add_argument('--counts', default='1,4,16,32', help="Comma-separated receipts per report")
+    parser.add_argument('--pools', default=f'0,2,{os.cpu_count() or 2}', help="Comma-separated pool sizes, 0 is in process")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement, the best is reported")
+    args = parser.parse_args()
+
+    counts = [int(value) for value in args.counts.split(',')]
+    pools = sorted({int(value) for value in args.pools.split(',')})
+
+    directory = tempfile.mkdtemp(prefix='report_bench_')
+    try:
+        print(f"Writing {max(counts)} photos of {PHOTO_SIZE[0]}x{PHOTO_SIZE[1]} to {directory} ...")
+        photos = []
+        for number in range(max(counts)):
+            photos.append(os.path.join(directory, f'photo{number:03d}.jpg'))
+            synthetic_photo(photos[-1], number)
+        summary = summary_pdf(directory)
+
+        timings = {}
+        for size in pools:
+            executor = None
+            if size:
+                executor = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context('spawn'))
+                list(executor.map(prepare_receipt_image, photos[:1] * size))
+            try:
+                for count in counts:
+                    timings[count, size] = time_merge(directory, summary, photos[:count], executor, args.repeat)
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+
+        print(f"\nWall-clock seconds per report ({os.cpu_count()} CPUs, speedup against pool size {pools[0]}):")
+        print(f"{'receipts':>8} " + ' '.join(f"{f'pool {size}':>16}" for size in pools))
+        for count in counts:
+            base = timings[count, pools[0]]
+            cells = [f"{timings[count, size]:7.2f} ({base / timings[count, size]:4.1f}x)" for size in pools]
+            print(f"{count:>8} " + ' '.join(f"{cell:>16}" for cell in cells))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -34,4 +34,14 @@ def client(app):
 def db_session(app):
     """Create a fresh database session for a test."""
     with app.app_context():
-        yield db.session 
\ No newline at end of file
+        yield db.session
+
+@pytest.fixture
+def fake_data():
+    """Build a tesseract image_to_data result of the words in text, all at one confidence."""
+    def build(text, conf):
+        words = text.split()
+        return {'text': words, 'left': [0] * len(words), 'top': [0] * len(words),
+                'width': [10] * len(words), 'height': [10] * len(words), 'conf': [conf] * len(words),
+                'block_num': [1] * len(words), 'par_num': [1] * len(words), 'line_num': [1] * len(words)}
+    return build
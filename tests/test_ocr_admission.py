@@ -0,0 +1,83 @@
+import io
+import threading
+import pytest
+from app.ocr import ReceiptScanner
+from app.utils.ocr_admission import OCRAdmissionController, OCRBusy
+from app.utils.ocr_metrics import MetricsRegistry
+
+def test_queue_full_is_rejected_with_retry_after():
+    controller = OCRAdmissionController(max_concurrent=1, max_waiting=0, metrics=MetricsRegistry())
+    with controller.slot():
+        with pytest.raises(OCRBusy) as busy:
+            with controller.slot():
+                pass
+    assert busy.value.retry_after >= 1
+    assert controller.metrics.snapshot()['counters']['admission.rejected.queue_full'] == 1
+
+def test_waiter_is_admitted_when_slot_frees():
+    metrics = MetricsRegistry()
+    controller = OCRAdmissionController(max_concurrent=1, max_waiting=1, wait_timeout=5, metrics=metrics)
+    admitted = threading.Event()
+
+    def wait_for_slot():
+        with controller.slot():
+            admitted.set()
+
+    with controller.slot():
+        waiter = threading.Thread(target=wait_for_slot)
+        waiter.start()
+        assert not admitted.wait(0.05)
+        assert metrics.snapshot()['gauges']['admission.waiting'] == 1
+    waiter.join(2)
+    assert admitted.is_set()
+    assert metrics.snapshot()['timings']['admission.wait']['count'] == 2
+
+def test_wait_times_out():
+    controller = OCRAdmissionController(max_concurrent=1, max_waiting=1, wait_timeout=0.01, metrics=MetricsRegistry())
+    with controller.slot():
+        with pytest.raises(OCRBusy):
+            with controller.slot():
+                pass
+
+def test_busy_scan_returns_503(client, monkeypatch):
+    def busy(self, file, filename=None, profile=None):
+        raise OCRBusy('busy', retry_after=7)
+    monkeypatch.setattr(ReceiptScanner, 'scan_receipt', busy)
+
+    response = client.post('/process_receipt?mode=sync', data={'file': (io.BytesIO(b'fake'), 'receipt.jpg')})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '7'
+
+def test_slot_wait_does_not_count_against_scan_budget(app, monkeypatch, fake_data):
+    import app.ocr as ocr_module
+    from PIL import Image
+    from app.utils import ocr_processor
+    from app.utils.ocr_cache import ocr_cache
+    from app.utils.ocr_profiles import PROFILES
+
+    controller = OCRAdmissionController(max_concurrent=1, metrics=MetricsRegistry())
+    monkeypatch.setattr(ocr_module, 'ocr_admission', controller)
+    monkeypatch.setattr(ocr_cache, 'enabled', False)
+    monkeypatch.setitem(PROFILES['fast'], 'time_budget', 0.2)
+    calls = []
+    monkeypatch.setattr(ocr_processor.ocr_pool, 'image_to_data',
+                        lambda image, lang, timeout=None: calls.append(timeout) or fake_data('Total 4.00', 90))
+    buffer = io.BytesIO()
+    Image.new('RGB', (100, 100), 'white').save(buffer, format='PNG')
+
+    # The slot is busy for twice the profile's budget before the scan gets it
+    holding = threading.Event()
+
+    def hold_slot():
+        with controller.slot():
+            holding.set()
+            threading.Event().wait(0.4)
+    holder = threading.Thread(target=hold_slot)
+    holder.start()
+    holding.wait(1)
+
+    result = ReceiptScanner(background=True).scan_receipt(buffer.getvalue(), 'receipt.png', profile='fast')
+    holder.join()
+    assert len(calls) == 1 and calls[0] > 0
+    assert not result.get('truncated')
+    assert result['timings']['admission_wait'] >= 0.3
@@ -0,0 +1,35 @@
+from app.utils.ocr_cache import OCRResultCache
+
+SETTINGS = {'version': 1, 'lang': 'eng+deu'}
+
+def test_key_depends_on_content_and_settings():
+    key = OCRResultCache.make_key(b'receipt', SETTINGS)
+    assert key == OCRResultCache.make_key(b'receipt', dict(SETTINGS))
+    assert key != OCRResultCache.make_key(b'other receipt', SETTINGS)
+    assert key != OCRResultCache.make_key(b'receipt', {**SETTINGS, 'lang': 'deu'})
+
+def test_lru_eviction_and_counters():
+    cache = OCRResultCache(max_entries=2)
+    cache.set('a', {'total': 1.0})
+    cache.set('b', {'total': 2.0})
+    assert cache.get('a') == {'total': 1.0}  # a is now most recently used
+    cache.set('c', {'total': 3.0})           # evicts b
+
+    assert cache.get('b') is None
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 2
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    OCRResultCache(cache_dir=str(tmp_path)).set('abc123', {'total': 4.5, 'currency': 'EUR'})
+
+    fresh = OCRResultCache(cache_dir=str(tmp_path))
+    assert fresh.get('abc123') == {'total': 4.5, 'currency': 'EUR'}
+    assert fresh.stats()['disk_hits'] == 1
+
+def test_error_results_are_not_cached():
+    cache = OCRResultCache()
+    cache.set('bad', {'error': 'OCR failed', 'total': None})
+    assert cache.get('bad') is None
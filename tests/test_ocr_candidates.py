@@ -0,0 +1,25 @@
+import pytest
+from app.utils.ocr_candidates import extract_fields, parse_money, tokenize
+
+@pytest.mark.parametrize('text, expected', [
+    ("REWE Markt\nBanane 1,29\nSUMME EUR 12,50\nGegeben Bar 20,00\nRückgeld 7,50\nDatum: 10. 10. 2024 14:17",
+     {'currency': 'EUR', 'total': 12.5, 'date': '2024-10-10'}),
+    ("Joe's Diner\nSubtotal 17.00\nTax 1.36\nTotal $18.36\nCash 20.00\nChange 1.64\n03/14/2024 12:30",
+     {'currency': 'USD', 'total': 18.36, 'date': '2024-03-14'}),
+    ("Invoice date: 1 February 2024\nFlight 245,50 EUR\nTotal amount 1.245,50 EUR",
+     {'currency': 'EUR', 'total': 1245.5, 'date': '2024-02-01'}),
+    ("Wertstellungsdatum 5. März 2024\n-45,90 EUR Amazon",
+     {'currency': 'EUR', 'total': 45.9, 'date': '2024-03-05'}),
+    ("TOTAL\n245.50\nthank you", {'currency': None, 'total': 245.5, 'date': None}),
+])
+def test_extract_fields(text, expected):
+    assert extract_fields(text) == expected
+
+def test_dates_and_times_are_not_amounts():
+    kinds = [token['kind'] for token in tokenize("12.03.2024 14:17 9,99")]
+    assert kinds == ['date', 'time', 'money']
+
+def test_parse_money_separators():
+    assert parse_money('1.234,56')['amount'] == 1234.56
+    assert parse_money('1,234.56')['amount'] == 1234.56
+    assert parse_money('12')['has_cents'] is False
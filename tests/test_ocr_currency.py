@@ -0,0 +1,30 @@
+import pytest
+from app.utils.ocr_candidates import extract_fields
+from app.utils.ocr_currency import detect_currencies, find_currency_markers
+
+def test_longest_standalone_marker_wins():
+    assert [m['marker'] for m in find_currency_markers('US$ 5 Euros 3')] == ['us$', 'euros']
+    # 'us$' inside a word does not count, the '$' in it does
+    assert [(m['start'], m['marker']) for m in find_currency_markers('Bus$ 5')] == [(3, '$')]
+
+def test_markers_must_stand_alone():
+    assert detect_currencies('Steuro Loft') == []
+    assert [c['code'] for c in detect_currencies('EUR12,50')] == ['EUR']
+
+def test_ambiguous_kr_is_ranked_behind_the_iso_code():
+    ranked = detect_currencies('Summa 120,00 kr\nSEK')
+    assert ranked[0]['code'] == 'SEK'
+    assert ranked[0]['positions'] == [13, 16]
+
+@pytest.mark.parametrize('text, currency, total', [
+    ("Coop\nTotal CHF 18.40", 'CHF', 18.4),
+    ("Tesco\nTotal £12.99", 'GBP', 12.99),
+    ("Rema 1000\nSUM 89,90 kr\nNOK", 'NOK', 89.9),
+    ("Dubai Mall\nTotal AED 120.00", 'AED', 120.0),
+    ("Spar\nÖsszesen HUF 4590", 'HUF', 4590.0),
+    ("Hotel\nCity tax 2,00 EUR\nTotal USD 310.00", 'USD', 310.0),
+])
+def test_total_uses_nearest_currency(text, currency, total):
+    result = extract_fields(text)
+    assert result['currency'] == currency
+    assert result['total'] == total
@@ -0,0 +1,128 @@
+import io
+import threading
+import time
+import pytest
+from app.ocr import ReceiptScanner
+from app.utils.ocr_jobs import OCRJobManager, OCRJobQueueFull, SQLiteJobStore, ocr_jobs
+
+def wait_for(manager, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError('job did not finish')
+
+def test_job_runs_and_reports_result():
+    manager = OCRJobManager(max_workers=1)
+    job_id = manager.submit(lambda: {'total': 12.5}, owner='user:1')
+
+    job = wait_for(manager, job_id)
+    assert job['status'] == 'done'
+    assert job['progress'] == 100
+    assert job['result'] == {'total': 12.5}
+    assert manager.get(job_id, owner='user:2') is None
+
+def test_failed_job_records_error():
+    manager = OCRJobManager(max_workers=1)
+
+    def broken():
+        raise ValueError('bad image')
+
+    job = wait_for(manager, manager.submit(broken))
+    assert job['status'] == 'failed'
+    assert job['error'] == 'bad image'
+
+def test_queue_is_bounded():
+    manager = OCRJobManager(max_workers=1, max_pending=1)
+    release = threading.Event()
+    manager.submit(release.wait)
+
+    with pytest.raises(OCRJobQueueFull):
+        manager.submit(release.wait)
+    release.set()
+
+def test_sqlite_store_shares_jobs_between_processes(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite')
+    worker = OCRJobManager(max_workers=1, max_pending=1, store=SQLiteJobStore(path))
+    other_worker = OCRJobManager(max_workers=1, max_pending=1, store=SQLiteJobStore(path))
+    release = threading.Event()
+
+    def scan():
+        release.wait(5)
+        return {'total': 12.5}
+
+    job_id = worker.submit(scan, owner='user:1')
+    try:
+        with pytest.raises(OCRJobQueueFull):
+            other_worker.submit(scan)
+    finally:
+        release.set()
+
+    job = wait_for(other_worker, job_id)
+    assert job['result'] == {'total': 12.5}
+    assert other_worker.get(job_id, owner='user:2') is None
+
+def test_unfinished_jobs_are_failed_after_ttl():
+    manager = OCRJobManager(max_workers=1, max_pending=1, result_ttl=0)
+    release = threading.Event()
+    job_id = manager.submit(release.wait)
+
+    # The TTL has passed, so the stuck job no longer blocks the queue
+    manager.submit(lambda: {})
+    assert manager.get(job_id)['status'] == 'failed'
+    release.set()
+
+def test_process_receipt_async_returns_job(client, monkeypatch):
+    monkeypatch.setattr(ReceiptScanner, 'scan_receipt',
+                        lambda self, file, filename=None, profile=None: {'total': 9.999, 'date': None, 'currency': 'EUR'})
+
+    response = client.post('/process_receipt?mode=async',
+                           data={'file': (io.BytesIO(b'fake'), 'receipt.jpg')})
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+
+    job = wait_for(ocr_jobs, job_id)
+    assert job['result']['total'] == 10.0
+
+    status = client.get(f'/ocr/jobs/{job_id}')
+    assert status.status_code == 200
+    assert status.get_json()['status'] == 'done'
+
+def test_progressive_scan_returns_preview_then_refined_job(client, monkeypatch):
+    profiles = []
+
+    def scan(self, file, filename=None, profile=None):
+        profiles.append(profile)
+        return {'total': 9.0 if profile == 'preview' else 19.0, 'date': None, 'currency': 'EUR'}
+    monkeypatch.setattr(ReceiptScanner, 'scan_receipt', scan)
+
+    response = client.post('/process_receipt?mode=progressive',
+                           data={'file': (io.BytesIO(b'fake'), 'receipt.jpg')})
+    assert response.status_code == 200
+    preview = response.get_json()
+    assert preview['phase'] == 'preview' and preview['total'] == 9.0
+
+    job = wait_for(ocr_jobs, preview['job_id'])
+    assert job['result']['phase'] == 'final'
+    assert job['result']['total'] == 19.0
+    assert profiles == ['preview', 'balanced']
+
+def test_ocr_batch_returns_results_in_upload_order(app, client, monkeypatch):
+    app.config['LOGIN_DISABLED'] = True
+    monkeypatch.setattr(ReceiptScanner, 'scan_receipt',
+                        lambda self, file, filename=None, profile=None: {'total': float(len(file)), 'date': None, 'currency': None})
+
+    response = client.post('/ocr/batch', data={'receipts[]': [
+        (io.BytesIO(b'aaa'), 'first.jpg'),
+        (io.BytesIO(b'a'), 'second.jpg'),
+    ]})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [item['filename'] for item in results] == ['first.jpg', 'second.jpg']
+    assert [item['result']['total'] for item in results] == [3.0, 1.0]
+
+    streamed = client.post('/ocr/batch?stream=1', data={'receipts[]': [(io.BytesIO(b'ab'), 'third.jpg')]})
+    assert streamed.mimetype == 'application/x-ndjson'
+    assert b'"third.jpg"' in streamed.data
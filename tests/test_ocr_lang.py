@@ -0,0 +1,28 @@
+from PIL import Image
+from app.utils import ocr_processor
+from app.utils.ocr_metrics import ScanMetrics
+
+def test_probe_picks_single_language(monkeypatch, fake_data):
+    calls = []
+    monkeypatch.setattr(ocr_processor.ocr_pool, 'image_to_string', lambda image, lang, timeout=None: 'SUMME 12,50 EUR\nMwSt Bar')
+    monkeypatch.setattr(ocr_processor.ocr_pool, 'image_to_data',
+                        lambda image, lang, timeout=None: calls.append(lang) or fake_data('SUMME 12,50', 91))
+
+    metrics = ScanMetrics()
+    text, _, _, lang = ocr_processor.extract_words_with_language(Image.new('L', (100, 100)), metrics)
+    assert lang == 'deu'
+    assert calls == ['deu']
+    assert text == 'SUMME 12,50'
+    assert metrics.counters['lang.deu'] == 1
+
+def test_low_confidence_retries_combined_model(monkeypatch, fake_data):
+    calls = []
+    monkeypatch.setattr(ocr_processor.ocr_pool, 'image_to_string', lambda image, lang, timeout=None: 'Total Tax Cash $4.00')
+    monkeypatch.setattr(ocr_processor.ocr_pool, 'image_to_data',
+                        lambda image, lang, timeout=None: calls.append(lang) or fake_data('Total 4.00', 30 if lang == 'eng' else 80))
+
+    metrics = ScanMetrics()
+    _, _, _, lang = ocr_processor.extract_words_with_language(Image.new('L', (100, 100)), metrics)
+    assert calls == ['eng', 'eng+deu']
+    assert lang == 'eng+deu'
+    assert metrics.counters['lang.retry'] == 1
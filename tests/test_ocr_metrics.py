@@ -0,0 +1,26 @@
+from app.utils.ocr_metrics import MetricsRegistry, ScanMetrics
+from app.utils.ocr_processor import extract_receipt_fields
+
+def test_scan_metrics_accumulate_and_publish():
+    metrics = ScanMetrics()
+    for _ in range(2):
+        with metrics.stage('tesseract'):
+            pass
+    metrics.count('tesseract_calls', 2)
+
+    registry = MetricsRegistry()
+    metrics.publish(registry)
+    snapshot = registry.snapshot()
+    assert snapshot['counters'] == {'tesseract_calls': 2}
+    assert snapshot['timings']['stage.tesseract']['count'] == 1
+
+    result = metrics.attach({'total': 1.0})
+    assert set(result['timings']) == {'tesseract'}
+    assert result['counters'] == {'tesseract_calls': 2}
+
+def test_extraction_is_timed():
+    metrics = ScanMetrics()
+    result = extract_receipt_fields("REWE Markt\nSUMME EUR 12,50\n", metrics=metrics)
+    assert result['currency'] == 'EUR'
+    assert 'extraction' in metrics.timings
+    assert not metrics.counters
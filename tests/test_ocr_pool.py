@@ -0,0 +1,26 @@
+from concurrent.futures import Future
+from PIL import Image
+from app.utils.ocr_pool import TesseractPool
+
+class FakeApp:
+    def __init__(self, **config):
+        self.config = config
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(('text', 10.0))
+        return future
+
+def test_pool_starts_on_first_ocr_call_not_in_init_app(monkeypatch):
+    monkeypatch.setenv('FLASK_ENV', 'production')
+    pool = TesseractPool()
+    started = []
+    monkeypatch.setattr(pool, '_new_executor', lambda: started.append(1) or InlineExecutor())
+
+    # create_app runs this for CLI commands too; no workers may be spawned yet
+    pool.init_app(FakeApp(OCR_POOL_SIZE=2))
+    assert not pool.running and not started
+
+    assert pool.image_to_string(Image.new('L', (8, 8)), 'eng') == 'text'
+    assert pool.running and started == [1]
@@ -0,0 +1,28 @@
+import pytest
+from PIL import Image, ImageDraw
+
+np = pytest.importorskip('numpy')
+from app.utils import ocr_preprocess
+
+def receipt_photo(angle):
+    paper = Image.new('L', (400, 600), 230)
+    draw = ImageDraw.Draw(paper)
+    for y in range(30, 570, 18):
+        draw.text((30, y), f"Artikel {y}   12,50 EUR", fill=20)
+    paper = paper.rotate(-angle, expand=True, fillcolor=40)
+    photo = Image.new('L', (700, 900), 40)
+    photo.paste(paper, (100, 100))
+    return photo
+
+def test_crops_to_paper_and_straightens_text():
+    cleaned, info = ocr_preprocess.preprocess_image(receipt_photo(3.0))
+    assert info['cropped']
+    assert info['angle'] == pytest.approx(3.0, abs=0.5)
+    assert cleaned.mode == 'L' and cleaned.width < 700
+
+def test_threshold_ignores_uneven_lighting():
+    gradient = np.tile(np.linspace(60, 250, 200, dtype=np.uint8), (100, 1))
+    gradient[50, 20:180:10] = 0  # Dots of ink in dark and bright parts alike
+    binary = ocr_preprocess.adaptive_threshold(gradient, block=15)
+    assert (binary[50, 20:180:10] == 0).all()
+    assert (binary == 0).sum() == len(range(20, 180, 10))
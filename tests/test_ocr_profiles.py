@@ -0,0 +1,84 @@
+import io
+from PIL import Image
+from app.utils import ocr_processor
+from app.utils.ocr_metrics import ScanMetrics
+from app.utils.ocr_profiles import PROFILES
+
+def test_fast_profile_runs_one_pass(monkeypatch, fake_data):
+    calls = []
+    monkeypatch.setattr(ocr_processor.ocr_pool, 'image_to_data',
+                        lambda image, lang, timeout=None: calls.append(lang) or fake_data('Total 4.00', 30))
+
+    _, _, _, lang = ocr_processor.extract_words_with_language(Image.new('L', (100, 100)), ScanMetrics(), PROFILES['fast'])
+    assert calls == ['eng']
+    assert lang == 'eng'
+
+def test_retry_is_skipped_once_budget_is_spent(monkeypatch, fake_data):
+    metrics = ScanMetrics()
+    calls = []
+
+    def slow_pass(image, lang, timeout=None):
+        calls.append(lang)
+        metrics.started -= timeout  # The pass used up the whole budget
+        return fake_data('Total 4.00', 30)
+
+    monkeypatch.setattr(ocr_processor.ocr_pool, 'image_to_string', lambda image, lang, timeout=None: 'Total Tax Cash $4.00')
+    monkeypatch.setattr(ocr_processor.ocr_pool, 'image_to_data', slow_pass)
+
+    text, _, _, _ = ocr_processor.extract_words_with_language(Image.new('L', (100, 100)), metrics, PROFILES['balanced'])
+    assert calls == ['eng']
+    assert text == 'Total 4.00'
+    assert ocr_processor.is_truncated(metrics)
+
+def test_cancelled_pass_returns_truncated_result(monkeypatch):
+    def timed_out(image, lang, timeout=None):
+        raise ocr_processor.OCRTimeout('cancelled')
+    monkeypatch.setattr(ocr_processor.ocr_pool, 'image_to_data', timed_out)
+
+    result = ocr_processor.process_image(Image.new('RGB', (100, 100)), profile='fast')
+    assert result['truncated']
+    assert result['counters']['budget.timeout'] == 1
+
+def test_profile_is_part_of_cache_key_and_result(app, monkeypatch, fake_data):
+    from app.ocr import ReceiptScanner
+    from app.utils.ocr_cache import ocr_cache
+    assert ocr_processor.get_ocr_settings('fast') != ocr_processor.get_ocr_settings('accurate')
+
+    monkeypatch.setattr(ocr_cache, 'enabled', False)
+    monkeypatch.setattr(ocr_processor.ocr_pool, 'image_to_data', lambda image, lang, timeout=None: fake_data('Total 4.00', 90))
+    buffer = io.BytesIO()
+    Image.new('RGB', (100, 100), 'white').save(buffer, format='PNG')
+    result = ReceiptScanner().scan_receipt(buffer.getvalue(), 'receipt.png', profile='accurate')
+    assert result['ocr_profile'] == 'accurate'
+    assert result['ocr_lang'] == 'eng+deu'
+
+def test_unknown_profile_is_rejected(client):
+    response = client.post('/process_receipt?profile=turbo',
+                           data={'file': (io.BytesIO(b'data'), 'receipt.png')})
+    assert response.status_code == 400
+
+def test_spent_budget_on_last_pdf_page_is_not_truncated(monkeypatch):
+    from reportlab.pdfgen import canvas
+
+    def pdf_with_pages(count):
+        buffer = io.BytesIO()
+        document = canvas.Canvas(buffer)
+        for _ in range(count):
+            document.showPage()
+        document.save()
+        return buffer.getvalue()
+
+    def rasterize(pdf, dpi=None, max_pages=None, stats=None, deadline=None):
+        for _ in range(max_pages):
+            yield Image.new('RGB', (100, 100))
+
+    def slow_page(image, metrics, profile=None):
+        metrics.started -= 1000  # The page used up the whole budget
+        return {'total': None, 'date': None, 'currency': None}
+
+    monkeypatch.setattr(ocr_processor, 'extract_pdf_text', lambda pdf, max_pages=None: '')
+    monkeypatch.setattr(ocr_processor, 'iter_pdf_pages', rasterize)
+    monkeypatch.setattr(ocr_processor, 'process_image', slow_page)
+
+    assert not ocr_processor.process_pdf(pdf_with_pages(1), max_pages=2)['truncated']
+    assert ocr_processor.process_pdf(pdf_with_pages(2), max_pages=2)['truncated']
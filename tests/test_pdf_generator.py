@@ -0,0 +1,83 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image
+from PyPDF2 import PdfReader
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from app import pdf_generator
+from app.pdf_generator import ExpenseReportGenerator
+
+def test_merge_embeds_downscaled_receipt_photo(tmp_path):
+    summary_path, _ = ExpenseReportGenerator('Test User').generate_report(
+        expenses=[{'date': '2025-03-01', 'description': 'Lunch', 'amount': 12.5, 'original_currency': 'EUR', 'original_amount': 12.5}]
+    )
+    photo_path = str(tmp_path / 'receipt.jpg')
+    Image.effect_noise((2400, 3200), 60).convert('RGB').save(photo_path, quality=95)
+
+    stats = {}
+    final_path = ExpenseReportGenerator.merge_with_receipts(summary_path, [photo_path], stats=stats)
+    try:
+        assert final_path.endswith('_complete.pdf')
+        assert stats['bytes_saved'] == stats['image_bytes_original'] - stats['image_bytes_embedded'] > 0
+        assert len(PdfReader(final_path).pages) == 2
+        assert os.path.getsize(final_path) < stats['image_bytes_original'] / 2
+    finally:
+        os.remove(final_path)
+
+def test_merge_keeps_upload_order_of_images_and_pdfs(tmp_path):
+    summary_path, _ = ExpenseReportGenerator('Test User').generate_report(expenses=[])
+    photo_path = str(tmp_path / 'photo.jpg')
+    Image.new('RGB', (400, 600), 'white').save(photo_path)
+    invoice_path = str(tmp_path / 'invoice.pdf')
+    invoice = canvas.Canvas(invoice_path, pagesize=(200, 300))
+    invoice.showPage()
+    invoice.showPage()
+    invoice.save()
+
+    drawn = []
+    final_path = ExpenseReportGenerator.merge_with_receipts(summary_path, [photo_path, invoice_path, photo_path],
+                                                            on_page=lambda: drawn.append(1))
+    try:
+        assert len(drawn) == 2
+        sizes = [tuple(round(float(v)) for v in page.mediabox[2:]) for page in PdfReader(final_path).pages]
+        a4 = tuple(round(v) for v in A4)
+        assert sizes[1:] == [a4, (200, 300), (200, 300), a4]
+        assert not os.path.exists(summary_path.replace('_summary.pdf', '_images.pdf'))
+    finally:
+        os.remove(final_path)
+
+class BrokenExecutor:
+    def submit(self, fn, *args):
+        raise BrokenProcessPool('worker died')
+
+def test_photos_prepared_on_pool_keep_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_generator, 'RENDER_PREFETCH', 2)
+    paths = []
+    for i, size in enumerate([(400, 600), (600, 400), (300, 300), (500, 800), (800, 100)]):
+        paths.append(str(tmp_path / f'photo{i}.jpg'))
+        Image.new('RGB', size, 'white').save(paths[-1])
+
+    def sizes(results):
+        return [(path, round(prepared['width'] / prepared['height'], 2)) for path, prepared, _ in results]
+
+    expected = sizes(pdf_generator._prepare_in_order(paths))
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        assert sizes(pdf_generator._prepare_in_order(paths, executor)) == expected
+
+    stats = {}
+    assert sizes(pdf_generator._prepare_in_order(paths, BrokenExecutor(), stats)) == expected
+    assert stats['render_pool_broken']
+
+def test_generators_share_report_template():
+    first = ExpenseReportGenerator('Test User')
+    second = ExpenseReportGenerator('Other User', 'travel')
+    assert first.template is second.template
+
+    paths = [generator.generate_report(expenses=[])[0] for generator in (first, second)]
+    try:
+        for path in paths:
+            assert 'Expense claim' in PdfReader(path).pages[0].extract_text()
+    finally:
+        for path in paths:
+            os.remove(path)
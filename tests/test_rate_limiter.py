@@ -0,0 +1,76 @@
+import io
+import multiprocessing
+from app.utils.rate_limiter import RateLimiter, MemoryBackend, SQLiteBackend, sliding_window
+
+def test_sliding_window_weights_previous_window():
+    state, allowed, _ = None, True, 0
+    for _ in range(10):
+        state, allowed, _ = sliding_window(state, 100.0, limit=10, period=60)
+        assert allowed
+    state, allowed, retry_after = sliding_window(state, 119.0, limit=10, period=60)
+    assert not allowed and retry_after >= 1
+
+    # Halfway through the next window half of the previous count still applies
+    state, allowed, _ = sliding_window(state, 150.0, limit=10, period=60)
+    assert allowed and state == (120.0, 1, 10)
+    for _ in range(4):
+        state, allowed, _ = sliding_window(state, 150.0, limit=10, period=60)
+    assert allowed
+    _, allowed, _ = sliding_window(state, 150.0, limit=10, period=60)
+    assert not allowed
+
+    # A client idle for more than a window starts over
+    _, allowed, _ = sliding_window(state, 400.0, limit=10, period=60)
+    assert allowed
+
+def test_sliding_window_charges_cost():
+    state, allowed, _ = sliding_window(None, 100.0, limit=10, period=60, cost=8)
+    assert allowed and state == (60.0, 8, 0)
+    # Still under the limit, so the batch is admitted and overdraws the budget
+    state, allowed, _ = sliding_window(state, 100.0, limit=10, period=60, cost=8)
+    assert allowed and state == (60.0, 16, 0)
+    _, allowed, _ = sliding_window(state, 100.0, limit=10, period=60)
+    assert not allowed
+
+def test_memory_backend_evicts_oldest_client():
+    limiter = RateLimiter(limit=1, period=60, backend=MemoryBackend(max_keys=2))
+    for client in ('a', 'b', 'c'):
+        assert not limiter.is_rate_limited(client)
+    assert list(limiter.backend.states) == ['b', 'c']
+    assert limiter.is_rate_limited('c')
+
+def hit_shared_limiter(path, results):
+    limiter = RateLimiter(limit=10, period=60, backend=SQLiteBackend(path))
+    results.put([limiter.hit('user:1')[0] for _ in range(4)])
+
+def test_sqlite_limit_holds_across_processes(tmp_path):
+    path = str(tmp_path / 'rate_limits.sqlite')
+    SQLiteBackend(path)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=hit_shared_limiter, args=(path, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    allowed = sum(sum(results.get(timeout=30)) for _ in workers)
+    for worker in workers:
+        worker.join()
+    assert allowed == 10
+
+def test_rate_limited_route_returns_retry_after(app, client, monkeypatch):
+    from app.routes import ocr_routes
+    monkeypatch.setattr(ocr_routes, 'rate_limiter', RateLimiter(limit=1, period=60))
+    client.post('/process_receipt')
+    response = client.post('/process_receipt')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+def test_batch_is_charged_per_file(app, client, monkeypatch):
+    from app.routes import ocr_routes
+    app.config['LOGIN_DISABLED'] = True
+    monkeypatch.setattr(ocr_routes, 'rate_limiter', RateLimiter(limit=3, period=60))
+    monkeypatch.setattr(ocr_routes, 'scan_receipt_job', lambda data, filename, profile=None: {'total': None})
+    files = lambda: {'receipts[]': [(io.BytesIO(b'a'), f'{number}.jpg') for number in range(3)]}
+
+    # Rejected batches cost nothing
+    assert client.post('/ocr/batch?profile=unknown', data=files()).status_code == 400
+    assert client.post('/ocr/batch', data=files()).status_code == 200
+    assert client.post('/ocr/batch', data=files()).status_code == 429
@@ -0,0 +1,113 @@
+import json
+from datetime import datetime, timezone, timedelta
+from app.models import User, Receipt
+from app.pdf_generator import ExpenseReportGenerator
+from app.utils import report_pipeline as pipeline_module
+
+def login(client, db_session):
+    user = User(email='test@example.com', name='Test User')
+    db_session.add(user)
+    db_session.commit()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+    return user
+
+def expense_form():
+    return {
+        'date[]': ['2025-03-01'],
+        'amount[]': ['12.50'],
+        'description[]': ['Lunch'],
+        'currency[]': ['EUR'],
+        'original_amount[]': ['12.50'],
+        'expense-type': 'other',
+        'comment': 'Team lunch',
+    }
+
+def stub_report_building(monkeypatch):
+    monkeypatch.setattr(ExpenseReportGenerator, 'generate_report',
+                        lambda self, expenses, travel_details=None, comment=None: ('/tmp/summary.pdf', 'report-1'))
+    monkeypatch.setattr(ExpenseReportGenerator, 'merge_with_receipts',
+                        staticmethod(lambda summary, receipts, stats=None, executor=None, on_page=None: '/tmp/final.pdf'))
+    monkeypatch.setattr(pipeline_module, 'notify_reviewers_of_new_receipt', lambda receipt: None)
+
+def test_submit_expense_builds_report_in_pipeline(client, db_session, monkeypatch):
+    login(client, db_session)
+    statuses = []
+
+    def generate_report(self, expenses, travel_details=None, comment=None):
+        statuses.append(Receipt.query.one().status)
+        return '/tmp/summary.pdf', 'report-1'
+    monkeypatch.setattr(ExpenseReportGenerator, 'generate_report', generate_report)
+    monkeypatch.setattr(ExpenseReportGenerator, 'merge_with_receipts',
+                        staticmethod(lambda summary, receipts, stats=None, executor=None, on_page=None: '/tmp/final.pdf'))
+    notified = []
+    monkeypatch.setattr(pipeline_module, 'notify_reviewers_of_new_receipt', notified.append)
+
+    response = client.post('/submit_expense', data=expense_form())
+    assert response.get_json()['success']
+
+    receipt = Receipt.query.one()
+    assert statuses == ['processing']
+    assert receipt.status == 'pending' and receipt.progress == 100
+    assert receipt.file_path_db == '/tmp/final.pdf'
+    assert notified == [receipt]
+
+    status = client.get(f'/receipt/{receipt.id}/status')
+    assert status.get_json() == {'status': 'pending', 'progress': 100}
+
+def test_failed_report_marks_receipt_failed(client, db_session, monkeypatch):
+    login(client, db_session)
+
+    def broken(self, expenses, travel_details=None, comment=None):
+        raise OSError('disk full')
+    monkeypatch.setattr(ExpenseReportGenerator, 'generate_report', broken)
+
+    response = client.post('/submit_expense', data=expense_form())
+    assert response.get_json()['success']
+    receipt = Receipt.query.one()
+    assert receipt.status == 'failed'
+    assert receipt.file_path is None
+
+    # The saved input lets the owner build it again
+    stub_report_building(monkeypatch)
+    client.post(f'/receipt/{receipt.id}/retry_report')
+    db_session.refresh(receipt)
+    assert receipt.status == 'pending'
+    assert receipt.file_path_db == '/tmp/final.pdf'
+    assert receipt.report_data is None
+
+def test_stalled_build_is_requeued_when_polled(client, db_session, monkeypatch):
+    user = login(client, db_session)
+    stub_report_building(monkeypatch)
+    report = {'user_name': 'Test User', 'expense_type': 'other', 'expenses': [], 'travel_details': None,
+              'comment': None, 'receipt_paths': [], 'base_url': 'http://localhost/'}
+    now = datetime.now(timezone.utc)
+    stalled, running = [
+        Receipt(user_id=user.id, amount=1, currency='EUR', status='processing', progress=40,
+                report_data=json.dumps(report), report_updated_at=updated_at)
+        for updated_at in (now - timedelta(hours=1), now)
+    ]
+    db_session.add_all([stalled, running])
+    db_session.commit()
+
+    assert client.get(f'/receipt/{running.id}/status').get_json()['status'] == 'processing'
+    assert client.get(f'/receipt/{stalled.id}/status').get_json() == {'status': 'pending', 'progress': 100}
+
+def test_build_taken_over_during_merge_does_not_write(client, db_session, monkeypatch):
+    login(client, db_session)
+    stub_report_building(monkeypatch)
+    notified = []
+    monkeypatch.setattr(pipeline_module, 'notify_reviewers_of_new_receipt', notified.append)
+
+    def merge(summary, receipts, stats=None, executor=None, on_page=None):
+        # Another process requeued the build and it was approved in the meantime
+        Receipt.query.update({'status': 'approved', 'report_claim': 'other-build'})
+        db_session.commit()
+        return '/tmp/late.pdf'
+    monkeypatch.setattr(ExpenseReportGenerator, 'merge_with_receipts', staticmethod(merge))
+
+    client.post('/submit_expense', data=expense_form())
+    receipt = Receipt.query.one()
+    assert receipt.status == 'approved'
+    assert receipt.file_path_db != '/tmp/late.pdf'
+    assert notified == []